@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+analytics_service.py
+
+Small read-only web service with the per-user views of the scripts, so staff
+do not have to run them by hand:
+
+  GET /users/<login>          profile JSON (show_user.py)
+  GET /users/<login>/alerts   alerts over the evaluations received (get_user_eval.py)
+  GET /users/<login>/hours    logged hours (logged_hours.py, or the location store when built)
+  GET /_stats                 cache counters
+
+Every view is computed once and kept in an in-memory LRU with its ETag, so a
+lookup is answered from memory (304 when the client already has it). A
+background thread recomputes the cached views and the cohort given with
+--cohort every --refresh seconds; the API calls behind it are conditional
+(api_client.py), so unchanged data costs little.
+
+Uso:
+  python analytics_service.py [--port 8042] [--cohort users/users.txt] [--refresh 900] [--lru 2048]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+
+import api_client
+import user_index
+import show_user
+import get_user_eval
+import logged_hours
+import location_store
+
+PORT = int(os.getenv("ANALYTICS_PORT", "8042"))
+REFRESH = 900  # seconds between background refreshes
+LRU_SIZE = 2048  # cached views
+VIEWS = ("profile", "alerts", "hours")
+
+
+# Least recently used views, each stored as {"etag", "body", "computed_at"}
+class LRU:
+    def __init__(self, size=LRU_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def keys(self):
+        with self._lock:
+            return list(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Service:
+    def __init__(self, lru_size=LRU_SIZE, store=location_store.STORE_DIR):
+        self.cache = LRU(lru_size)
+        self.store_path = store
+        self.headers = {}
+        self.token = None
+        self.stored_hours = {}  # login -> hours, precomputed from the location store
+        self.refreshed_at = None
+
+    def renew_token(self):
+        self.token = get_user_eval.get_token()
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+    # Hours of every user in the location store, computed once per refresh
+    def load_store(self):
+        try:
+            store = location_store.open_store(self.store_path)
+        except FileNotFoundError:
+            self.stored_hours = {}
+            return
+        self.stored_hours = {store["logins"].get(u, str(u)): h for u, h in location_store.hours_by_user(store).items()}
+
+    # Id and 42cursus level from the user index, or from the profile (a 404 raises FileNotFoundError)
+    def user_data(self, login):
+        entry = user_index.cached_entry(login)
+        if entry:
+            return entry["id"], entry.get("level")
+        data = show_user.fetch_user(login, self.token)
+        level = next((c.get("level") for c in data.get("cursus_users", []) if c.get("cursus_id") == 21), None)
+        user_index.remember(login, data["id"], level)
+        return data["id"], level
+
+    def compute(self, view, login):
+        if view == "profile":
+            return show_user.fetch_user(login, self.token)
+
+        if view == "hours":
+            if login in self.stored_hours:
+                return {"login": login, "hours": self.stored_hours[login], "source": "location_store"}
+            locations = logged_hours.get_locations(self.token, login)
+            return {"login": login, "hours": logged_hours.calc_hours(locations), "source": "api"}
+
+        user_id, level = self.user_data(login)
+        evals = get_user_eval.get_received_evaluations(user_id, self.headers)
+        alerts = []
+        threshold = None
+        if level is not None:
+            counter = get_user_eval.count_received(evals, login)
+            threshold, found = get_user_eval.received_alerts(level, counter)
+            alerts = [{"evaluator": evaluator, "evaluator_level": user_index.cached_level(evaluator)[1],
+                       "times": times, "adjusted": adjusted}
+                      for evaluator, times, adjusted in found]
+        return {"login": login, "level": level, "evaluations": len(evals),
+                "threshold": threshold, "alerts": alerts}
+
+    # Computes a view and caches it. The ETag only changes when the content does.
+    def refresh(self, view, login):
+        body = json.dumps(self.compute(view, login), ensure_ascii=False, sort_keys=True).encode("utf-8")
+        entry = {
+            "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+            "body": body,
+            "computed_at": time.time(),
+        }
+        self.cache.put((view, login), entry)
+        return entry
+
+    def lookup(self, view, login):
+        return self.cache.get((view, login)) or self.refresh(view, login)
+
+    # Background loop: new token, store reloaded, cached views and cohort recomputed
+    def refresh_loop(self, cohort, interval):
+        while True:
+            started = time.time()
+            try:
+                self.renew_token()
+                self.load_store()
+            except Exception as e:
+                print(f"[refresh] {e}", file=sys.stderr)
+            keys = dict.fromkeys(self.cache.keys())
+            keys.update(dict.fromkeys((view, login) for login in cohort for view in VIEWS))
+            for view, login in keys:
+                try:
+                    self.refresh(view, login)
+                except Exception as e:
+                    print(f"[refresh] {view} {login}: {e}", file=sys.stderr)
+            self.refreshed_at = time.time()
+            print(f"[refresh] {len(keys)} views in {self.refreshed_at - started:.1f}s", file=sys.stderr)
+            time.sleep(max(0, interval - (time.time() - started)))
+
+
+service = None
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        parts = [unquote(p) for p in self.path.split("?")[0].strip("/").split("/")]
+        if parts == ["_stats"]:
+            return self._json(200, {
+                "cached_views": len(service.cache), "hits": service.cache.hits, "misses": service.cache.misses,
+                "requests": dict(api_client.stats), "refreshed_at": service.refreshed_at,
+            })
+        if len(parts) == 2 and parts[0] == "users":
+            view = "profile"
+        elif len(parts) == 3 and parts[0] == "users" and parts[2] in ("alerts", "hours"):
+            view = parts[2]
+        else:
+            return self._json(404, {"error": "unknown path"})
+
+        try:
+            entry = service.lookup(view, parts[1])
+        except FileNotFoundError as e:
+            return self._json(404, {"error": str(e)})
+        except requests.exceptions.RequestException as e:
+            return self._json(502, {"error": str(e)})
+        except Exception as e:
+            return self._json(500, {"error": str(e)})
+
+        headers = {"ETag": entry["etag"], "Age": str(int(time.time() - entry["computed_at"]))}
+        if self.headers.get("If-None-Match") == entry["etag"]:
+            return self._send(304, b"", headers)
+        self._send(200, entry["body"], headers)
+
+    def _json(self, status, data):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+def read_logins(path):
+    if not path:
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+def main():
+    global service
+    parser = argparse.ArgumentParser(description="Read-only web service with cached per-user analytics.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--cohort", help="file with logins whose views are precomputed")
+    parser.add_argument("--refresh", type=int, default=REFRESH, help="seconds between background refreshes")
+    parser.add_argument("--lru", type=int, default=LRU_SIZE, help="views kept in memory")
+    parser.add_argument("--store", default=location_store.STORE_DIR, help="location store used for the hours")
+    args = parser.parse_args()
+
+    try:
+        cohort = read_logins(args.cohort)
+    except FileNotFoundError:
+        print(f"[ERROR] No {args.cohort} found.")
+        sys.exit(2)
+
+    service = Service(args.lru, args.store)
+    try:
+        service.renew_token()
+    except Exception as e:
+        print(f"[ERROR] Cannot obtain token: {e}", file=sys.stderr)
+        sys.exit(2)
+    service.load_store()
+    threading.Thread(target=service.refresh_loop, args=(cohort, args.refresh), daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"Analytics on http://{args.host}:{args.port} ({len(cohort)} logins precomputed every {args.refresh}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+"""
+api_client.py
+
+Shared HTTP layer for the 42 API scripts.
+
+Every GET goes through get(). The validators (ETag / Last-Modified) of each
+URL are kept on disk together with the decoded body, and the next request
+for that URL is sent as a conditional request: a 304 answer is served from
+the stored body without downloading or decoding it again.
+
+Identical GETs issued concurrently from several threads are coalesced: the
+first one goes to the network and the others wait for its decoded result.
+
+Requests on the network are limited by an AIMD concurrency window: it grows
+by one slot per window of fast 2xx answers and is halved on 429, 5xx or when
+latency rises well above the best recent one, so threaded jobs follow the
+capacity the API actually has at the moment. A 429 answer is retried after
+its Retry-After (seconds or HTTP date) up to API_MAX_RETRIES times, then
+returned to the caller.
+
+Environment:
+  HTTP_CACHE=0        disable conditional requests
+  HTTP_CACHE_DIR=...  where validators and bodies are stored (default .cache/http)
+  HTTP_MEMORY_ENTRIES=256   decoded bodies kept in memory, the rest is read from disk
+  API_MIN_CONCURRENCY / API_MAX_CONCURRENCY   bounds of the window (default 1 / 8)
+  API_MAX_RETRIES=5   retries of a request answered with 429
+  API_GATEWAY_URL=http://127.0.0.1:4242   send API requests through api_gateway.py (no token request)
+  API_PRIORITY=bulk|interactive           lane of this process in the gateway (default bulk)
+  API_GATEWAY_TIMEOUT=600                 read timeout of requests queued in the gateway
+  API_MODE=record|replay   record every GET answer as a gzip fixture, or serve
+                           them back with no network (tokens included)
+  API_FIXTURES=...         fixture folder (default .cache/fixtures)
+"""
+
+import os
+import sys
+import json
+import gzip
+import atexit
+import hashlib
+import time
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+
+CACHE_ENABLED = os.getenv("HTTP_CACHE", "1") != "0"
+CACHE_DIR = Path(os.getenv("HTTP_CACHE_DIR", Path(__file__).parent / "../.cache/http"))
+TIMEOUT = 15
+MEMORY_ENTRIES = int(os.getenv("HTTP_MEMORY_ENTRIES", "256"))
+MIN_CONCURRENCY = int(os.getenv("API_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "8"))
+LATENCY_FACTOR = 3  # latency over this many times the base one counts as congestion
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "5"))  # 429 answers retried before giving up
+MAX_RETRY_AFTER = 60  # longest wait honoured from a Retry-After header
+API_ORIGIN = "https://api.intra.42.fr"
+GATEWAY_URL = os.getenv("API_GATEWAY_URL")
+PRIORITY = os.getenv("API_PRIORITY", "bulk")
+GATEWAY_TIMEOUT = float(os.getenv("API_GATEWAY_TIMEOUT", "600"))  # bulk requests may wait in the queue
+MODE = os.getenv("API_MODE", "live")  # live, record or replay
+FIXTURE_DIR = Path(os.getenv("API_FIXTURES", Path(__file__).parent / "../.cache/fixtures"))
+FIXTURE_HEADERS = ("Link", "X-Total", "X-Per-Page", "X-Page")
+
+# Called before every request on the network when set (api_gateway.py uses it for its rate budget)
+throttle = None
+
+stats = Counter()  # hits, misses, coalesced, backoffs, rate_limited, recorded, replayed
+_memory = OrderedDict()  # key -> cache entry, the MEMORY_ENTRIES most recently used
+_inflight = {}  # key -> _Flight of the request currently on the network
+_lock = threading.Lock()
+
+
+# No recorded answer for a request in replay mode
+class FixtureMissing(RuntimeError):
+    pass
+
+
+# Response built from a decoded body (or the raw text of a non JSON one, in
+# fixtures), with the parts of requests.Response the scripts use
+class CachedResponse:
+    def __init__(self, entry, from_cache=True):
+        self.url = entry["url"]
+        self.status_code = entry.get("status_code", 200)
+        self.headers = requests.structures.CaseInsensitiveDict(entry.get("headers", {}))
+        self.from_cache = from_cache
+        self._data = entry.get("body")
+        self._text = entry.get("text")
+
+    def json(self):
+        if self._text is not None:
+            return json.loads(self._text)
+        return self._data
+
+    @property
+    def text(self):
+        if self._text is not None:
+            return self._text
+        return json.dumps(self._data, ensure_ascii=False)
+
+    @property
+    def content(self):
+        return self.text.encode("utf-8")
+
+    @property
+    def links(self):
+        header = self.headers.get("Link")
+        if not header:
+            return {}
+        links = {}
+        for link in requests.utils.parse_header_links(header):
+            links[link.get("rel") or link.get("url")] = link
+        return links
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+# Endpoint of a URL for the latency baselines: the resource names with the
+# ids and logins between them replaced, /v2/users/bob/locations -> users/*/locations
+def endpoint(url):
+    parts = urlsplit(url).path.strip("/").split("/")
+    if parts and parts[0] == "v2":
+        parts = parts[1:]
+    return "/".join("*" if i % 2 else part for i, part in enumerate(parts))
+
+
+# AIMD limit of requests on the network at the same time. acquire() blocks
+# while the window is full, release() feeds back the status and latency.
+# Latency is compared with the best recent one of the same endpoint, a page
+# of 100 scale_teams is not congestion because a profile answers faster.
+class Concurrency:
+    def __init__(self, initial=2, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.window = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.peak = self.window
+        self.base_latency = {}  # endpoint -> best recent latency
+        self._last_backoff = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.window):
+                self._cond.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started, status, endpoint=""):
+        now = time.monotonic()
+        latency = now - started
+        with self._cond:
+            self.in_flight -= 1
+            if status == 429 or status >= 500:
+                self._backoff(now, latency)
+            elif status < 400:
+                # the base drifts up slowly so it follows the API through the day
+                base = self.base_latency.get(endpoint)
+                base = latency if base is None or latency < base else base * 1.01
+                self.base_latency[endpoint] = base
+                if latency > LATENCY_FACTOR * base:
+                    self._backoff(now, latency)
+                else:
+                    self.window = min(self.maximum, self.window + 1 / self.window)
+                    self.peak = max(self.peak, self.window)
+            self._cond.notify_all()
+
+    # Halves the window at most once per round trip, the answers of requests
+    # sent with the old window must not shrink it again
+    def _backoff(self, now, latency):
+        if now - self._last_backoff < latency:
+            return
+        self._last_backoff = now
+        self.window = max(self.minimum, self.window / 2)
+        with _lock:
+            stats["backoffs"] += 1
+
+
+concurrency = Concurrency()
+
+
+# Full URL with sorted params, identical requests get the same key
+def normalize_url(url, params=None):
+    if params:
+        params = sorted((k, v) for k, v in params.items() if v is not None)
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+def cache_key(url, params=None):
+    return hashlib.sha256(normalize_url(url, params).encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+# Keeps an entry in the in-memory LRU. Call with _lock held.
+def _remember(key, entry):
+    _memory[key] = entry
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def _load(key):
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+    try:
+        with _path(key).open("r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    with _lock:
+        _remember(key, entry)
+    return entry
+
+
+def _store(key, entry):
+    with _lock:
+        _remember(key, entry)
+    path = _path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[api_client] cannot write cache entry: {e}", file=sys.stderr)
+
+
+# One request on the network, shared by every caller asking for the same key
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+# GET with conditional requests and coalescing. Returns a CachedResponse for
+# JSON bodies (from_cache tells whether it came from a 304) and the plain
+# requests.Response otherwise. With API_GATEWAY_URL set, API requests go to the
+# gateway instead, which owns the token, cache and rate budget; `priority`
+# picks its lane. API_MODE=record|replay stores / serves the answers as fixtures.
+def get(url, headers=None, params=None, timeout=TIMEOUT, priority=None):
+    if MODE == "replay":
+        return _replay(url, params)
+    res = _get(url, headers, params, timeout, priority)
+    if MODE == "record":
+        _record(url, params, res)
+    return res
+
+
+# POST for the token requests (and webhooks). In replay mode nothing is sent:
+# token endpoints get a placeholder token and the rest an empty answer. Behind
+# the gateway the token request is not sent either, the gateway puts its own
+# token on every request and owns the whole rate budget.
+def post(url, headers=None, data=None, json=None, timeout=TIMEOUT):
+    is_token = url.endswith("/oauth/token")
+    if MODE == "replay":
+        body = {"access_token": "replay", "token_type": "bearer"} if is_token else {}
+        return CachedResponse({"url": url, "body": body})
+    if GATEWAY_URL and is_token and url.startswith(API_ORIGIN):
+        return CachedResponse({"url": url, "body": {"access_token": "gateway", "token_type": "bearer"}})
+    return requests.post(url, headers=headers, data=data, json=json, timeout=timeout)
+
+
+def _get(url, headers, params, timeout, priority):
+    if GATEWAY_URL and url.startswith(API_ORIGIN):
+        url = GATEWAY_URL.rstrip("/") + url[len(API_ORIGIN):]
+        headers = {**(headers or {}), "X-Priority": priority or PRIORITY}
+        timeout = (timeout, max(timeout, GATEWAY_TIMEOUT))  # the gateway may queue bulk requests for a while
+    key = cache_key(url, params)
+    with _lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+        else:
+            stats["coalesced"] += 1
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.response
+
+    try:
+        flight.response = _fetch(key, url, headers, params, timeout)
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _lock:
+            del _inflight[key]
+        flight.done.set()
+    return flight.response
+
+
+def _fetch(key, url, headers, params, timeout):
+    if not CACHE_ENABLED or GATEWAY_URL:
+        with _lock:
+            stats["misses"] += 1
+        return _decoded(_send(url, headers, params, timeout))
+
+    entry = _load(key)
+    headers = dict(headers or {})
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    res = _send(url, headers, params, timeout)
+
+    if res.status_code == 304 and entry:
+        with _lock:
+            stats["hits"] += 1
+        return CachedResponse(entry)
+
+    with _lock:
+        stats["misses"] += 1
+
+    shared = _decoded(res)
+    etag = res.headers.get("ETag")
+    last_modified = res.headers.get("Last-Modified")
+    if shared is not res and (etag or last_modified):
+        _store(key, {
+            "url": res.url,
+            "status_code": 200,
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {k: v for k, v in res.headers.items() if k in ("Link", "X-Total", "X-Per-Page", "X-Page")},
+            "body": shared.json(),
+        })
+    return shared
+
+
+def _fixture_path(key):
+    return FIXTURE_DIR / key[:2] / f"{key}.json.gz"
+
+
+# Stores the answer under the normalized URL, without the request headers (no token)
+def _record(url, params, res):
+    fixture = {
+        "url": normalize_url(url, params),
+        "status_code": res.status_code,
+        "headers": {k: res.headers[k] for k in FIXTURE_HEADERS if k in res.headers},
+    }
+    if isinstance(res, CachedResponse) and res._text is None:
+        fixture["body"] = res.json()
+    else:
+        fixture["text"] = res.text
+    path = _fixture_path(cache_key(url, params))
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[api_client] cannot write fixture: {e}", file=sys.stderr)
+        return
+    with _lock:
+        stats["recorded"] += 1
+
+
+def _replay(url, params):
+    try:
+        with gzip.open(_fixture_path(cache_key(url, params)), "rt", encoding="utf-8") as f:
+            fixture = json.load(f)
+    except FileNotFoundError:
+        raise FixtureMissing(f"no fixture recorded for {normalize_url(url, params)} in {FIXTURE_DIR}") from None
+    with _lock:
+        stats["replayed"] += 1
+    return CachedResponse(fixture)
+
+
+# Seconds to wait after a 429: Retry-After as seconds or as an HTTP date,
+# exponential when missing or unreadable, never more than MAX_RETRY_AFTER
+def retry_after(res, attempt=0):
+    value = (res.headers.get("Retry-After") or "").strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+            seconds = (moment - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError, IndexError):
+            seconds = 2 ** attempt
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+# The request, retried a bounded number of times while the API answers 429
+def _send(url, headers, params, timeout):
+    for attempt in range(MAX_RETRIES + 1):
+        res = _send_once(url, headers, params, timeout)
+        if res.status_code != 429 or attempt == MAX_RETRIES:
+            return res
+        with _lock:
+            stats["rate_limited"] += 1
+        time.sleep(retry_after(res, attempt))
+
+
+# The request itself, inside the concurrency window
+def _send_once(url, headers, params, timeout):
+    if GATEWAY_URL:  # the gateway applies its own window and rate budget
+        return requests.get(url, headers=headers, params=params, timeout=timeout)
+    if throttle:
+        throttle()
+    started = concurrency.acquire()
+    status = 599  # timeouts and connection errors count as overload
+    try:
+        res = requests.get(url, headers=headers, params=params, timeout=timeout)
+        status = res.status_code
+        return res
+    finally:
+        concurrency.release(started, status, endpoint(url))
+
+
+# Decodes a 200 JSON body once so every caller of a coalesced request shares it
+def _decoded(res):
+    if res.status_code != 200:
+        return res
+    try:
+        body = res.json()
+    except ValueError:
+        return res
+    return CachedResponse({
+        "url": res.url,
+        "status_code": 200,
+        "headers": dict(res.headers),
+        "body": body,
+    }, from_cache=False)
+
+
+def print_stats(file=sys.stderr):
+    if MODE == "replay":
+        if stats:
+            print(f"[api_client] {stats['replayed']} GET requests replayed from {FIXTURE_DIR}", file=file)
+        return
+    if stats["recorded"]:
+        print(f"[api_client] {stats['recorded']} fixtures recorded in {FIXTURE_DIR}", file=file)
+    if stats:
+        total = stats["hits"] + stats["misses"]
+        print(f"[api_client] {total} GET requests: {stats['hits']} not modified (cache hits), "
+              f"{stats['misses']} downloaded, {stats['coalesced']} coalesced, "
+              f"{stats['rate_limited']} retried after 429", file=file)
+        if GATEWAY_URL:
+            return
+        print(f"[api_client] concurrency window {concurrency.window:.1f} "
+              f"(peak {concurrency.peak:.1f}, {stats['backoffs']} backoffs)", file=file)
+
+
+atexit.register(print_stats)
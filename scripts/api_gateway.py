@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+api_gateway.py
+
+Local gateway to the 42 API shared by every script running on this machine.
+It owns the token of the app, one rate budget for all the processes, the
+response cache and the coalescing of identical requests (api_client.py), so
+two scripts running at the same time neither trip 429s together nor download
+the same thing twice.
+
+Requests wait for the rate budget in priority lanes: interactive lookups
+(show_user.py) are always served before queued bulk sweeps.
+
+Uso:
+  python api_gateway.py [--port 4242] [--rate 2] [--hourly 1200]
+  API_GATEWAY_URL=http://127.0.0.1:4242 python get_evals.py     (any script)
+  curl http://127.0.0.1:4242/_stats
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+import requests
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from dotenv import load_dotenv
+import api_client
+from rate_budget import RateBudget, RATE, HOURLY
+
+load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
+
+BASE_URL = "https://api.intra.42.fr"
+UID = os.getenv("UID")
+SECRET = os.getenv("SECRET")
+PORT = int(os.getenv("GATEWAY_PORT", "4242"))
+PASSED_HEADERS = ("Link", "X-Total", "X-Per-Page", "X-Page", "Retry-After")
+
+
+def get_token(uid, secret):
+    if not uid or not secret:
+        raise RuntimeError("UID y SECRET should be on .env")
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
+        "grant_type": "client_credentials",
+        "client_id": uid,
+        "client_secret": secret
+    }, timeout=10)
+    res.raise_for_status()
+    return res.json()["access_token"]
+
+
+class Token:
+    def __init__(self):
+        self.value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self.value is None:
+                self.value = get_token(UID, SECRET)
+            return self.value
+
+    # New token unless another thread already replaced the rejected one
+    def refresh(self, rejected):
+        with self._lock:
+            if self.value == rejected:
+                self.value = get_token(UID, SECRET)
+            return self.value
+
+
+budget = RateBudget()
+token = Token()
+_lane = threading.local()
+
+# api_client calls this right before each request that really goes to the API
+api_client.throttle = lambda: budget.acquire(getattr(_lane, "name", "bulk"))
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            return self._send(200, json.dumps({
+                "requests": dict(api_client.stats),
+                "window": round(api_client.concurrency.window, 2),
+                "queued": budget.queued(),
+                "served": budget.served,
+            }).encode("utf-8"))
+
+        _lane.name = self.headers.get("X-Priority", "bulk")
+        url = BASE_URL + self.path  # the query string is already part of the path
+        try:
+            current = token.get()
+            res = api_client.get(url, headers={"Authorization": f"Bearer {current}"})
+            if res.status_code == 401:
+                current = token.refresh(current)
+                res = api_client.get(url, headers={"Authorization": f"Bearer {current}"})
+        except requests.exceptions.RequestException as e:
+            return self._send(502, json.dumps({"error": str(e)}).encode("utf-8"))
+
+        body = res.text.encode("utf-8") if isinstance(res, api_client.CachedResponse) else res.content
+        self._send(res.status_code, body, {k: res.headers[k] for k in PASSED_HEADERS if k in res.headers})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    global budget
+    parser = argparse.ArgumentParser(description="Local gateway sharing token, cache and rate budget of the 42 API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--rate", type=float, default=RATE, help="requests per second")
+    parser.add_argument("--hourly", type=int, default=HOURLY, help="requests per hour")
+    args = parser.parse_args()
+
+    api_client.GATEWAY_URL = None  # the gateway itself talks to the API
+    budget = RateBudget(args.rate, args.hourly)
+    try:
+        token.get()
+    except Exception as e:
+        print(f"[ERROR] Cannot obtain token: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"Gateway on http://{args.host}:{args.port} ({args.rate}/s, {args.hourly}/h)")
+    print(f"Run the scripts with API_GATEWAY_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
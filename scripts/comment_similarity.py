@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+comment_similarity.py
+
+Finds near-identical evaluation comments in evaluaciones.csv (written by
+get_users_evals.py or run_jobs.py --analyses corrections). Copy-pasted
+feedback is a strong sign of evaluations that did not really happen.
+
+Each comment is normalized and cut into character shingles, summarized as a
+MinHash signature and hashed into LSH bands, so only comments sharing a band
+are compared: the cost grows with the number of comments, not its square.
+Comments whose estimated similarity reaches --threshold are grouped into
+clusters, reported as copied by one evaluator or shared across evaluators,
+and joined to the evaluator/evaluated pairs of the alert report.
+
+Uso:
+  python comment_similarity.py [--csv evaluaciones.csv] [--alerts resultados_kickoff_noviembre.xlsx]
+                               [--threshold 0.8] [--out results/comment_clusters.xlsx]
+"""
+
+import os
+import re
+import csv
+import sys
+import zlib
+import argparse
+from collections import defaultdict, Counter
+
+import numpy as np
+from openpyxl import Workbook, load_workbook
+
+import get_evals
+
+CSV_FILE = "evaluaciones.csv"
+OUT_FILE = "results/comment_clusters.xlsx"
+SHINGLE = 5  # characters per shingle
+PERMUTATIONS = 128
+BANDS = 32  # BANDS * rows must be PERMUTATIONS
+THRESHOLD = 0.8  # estimated Jaccard similarity to call two comments the same
+MIN_WORDS = 5  # shorter comments ("good job") are too common to mean anything
+PRIME = (1 << 31) - 1
+SEED = 42
+
+
+def normalize(comment):
+    return " ".join(re.sub(r"[^\w\s]", " ", comment.lower()).split())
+
+
+def shingles(text):
+    if len(text) <= SHINGLE:
+        return {text}
+    return {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+
+
+# Universal hash functions (a * x + b) mod PRIME, one per permutation
+def hash_functions(count=PERMUTATIONS, seed=SEED):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, PRIME, size=count, dtype=np.uint64)
+    b = rng.integers(0, PRIME, size=count, dtype=np.uint64)
+    return a, b
+
+
+def signature(text, a, b):
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) % PRIME for s in shingles(text)), dtype=np.uint64)
+    return ((np.outer(x, a) + b) % PRIME).min(axis=0)
+
+
+def similarity(sig1, sig2):
+    return float(np.mean(sig1 == sig2))
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+# Clusters of row indexes whose comments are near-identical. Every LSH
+# bucket is compared against its first member only, so a big bucket of one
+# pasted template costs one comparison per comment.
+def find_clusters(signatures, bands=BANDS, threshold=THRESHOLD):
+    rows = PERMUTATIONS // bands
+    uf = UnionFind(len(signatures))
+    compared = 0
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, sig in enumerate(signatures):
+            buckets[sig[band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                if uf.find(first) == uf.find(other):
+                    continue
+                compared += 1
+                if similarity(signatures[first], signatures[other]) >= threshold:
+                    uf.union(first, other)
+
+    groups = defaultdict(list)
+    for i in range(len(signatures)):
+        groups[uf.find(i)].append(i)
+    clusters = [members for members in groups.values() if len(members) > 1]
+    clusters.sort(key=len, reverse=True)
+    return clusters, compared
+
+
+def read_comments(path, min_words=MIN_WORDS):
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            text = normalize(row.get("comment") or "")
+            if len(text.split()) >= min_words:
+                row["normalized"] = text
+                rows.append(row)
+    return rows
+
+
+# (evaluator, evaluated) -> alert row of every sheet of the alert report
+def read_alerts(path):
+    alerts = {}
+    wb = load_workbook(path, read_only=True)
+    for ws in wb.worksheets:
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header or "Evaluator" not in header or "Evaluated" not in header:
+            continue
+        i, j = header.index("Evaluator"), header.index("Evaluated")
+        for row in rows:
+            alerts.setdefault((row[i], row[j]), (ws.title, header, row))
+    return alerts
+
+
+def export(rows, clusters, alerts, out):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Clusters"
+    ws.append(["Cluster", "Comments", "Kind", "Evaluators", "Evaluated", "Example"])
+    cluster_of = {}
+    for n, members in enumerate(clusters, 1):
+        evaluators = Counter(rows[i]["evaluator_login"] for i in members)
+        evaluated = Counter(rows[i]["evaluated"] for i in members)
+        kind = "same evaluator" if len(evaluators) == 1 else "across evaluators"
+        ws.append([n, len(members), kind,
+                   ", ".join(f"{e} ({c})" for e, c in evaluators.most_common()),
+                   ", ".join(f"{e} ({c})" for e, c in evaluated.most_common(10)),
+                   rows[members[0]]["comment"][:500]])
+        for i in members:
+            cluster_of[i] = n
+
+    ws = wb.create_sheet("Comments")
+    ws.append(["Cluster", "Evaluator", "Evaluated", "Project", "Final Mark", "Created At", "Comment"])
+    for i in sorted(cluster_of, key=lambda i: (cluster_of[i], rows[i]["evaluator_login"])):
+        r = rows[i]
+        ws.append([cluster_of[i], r["evaluator_login"], r["evaluated"], r.get("proyect"),
+                   r.get("final_mark"), r.get("created_at"), r["comment"][:500]])
+
+    if alerts is not None:
+        by_pair = defaultdict(set)
+        for i, n in cluster_of.items():
+            by_pair[(rows[i]["evaluator_login"], rows[i]["evaluated"])].add(i)
+        ws = wb.create_sheet("Alerts")
+        header = None
+        for (evaluator, evaluated), (sheet, alert_header, alert) in alerts.items():
+            if header is None:
+                header = ["Sheet"] + list(alert_header) + ["Duplicated Comments", "Clusters"]
+                ws.append(header)
+            duplicated = by_pair.get((evaluator, evaluated), set())
+            ws.append([sheet] + list(alert) + [len(duplicated), ", ".join(str(c) for c in sorted({cluster_of[i] for i in duplicated}))])
+
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    wb.save(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate evaluation comments with MinHash and LSH.")
+    parser.add_argument("--csv", default=CSV_FILE, help=f"corrections dump (default {CSV_FILE})")
+    parser.add_argument("--alerts", default=get_evals.DESTINY_FILE, help="alert report to join (skipped if missing)")
+    parser.add_argument("--out", default=OUT_FILE, help=f"XLSX to write (default {OUT_FILE})")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="similarity to group two comments (0-1)")
+    parser.add_argument("--min-words", type=int, default=MIN_WORDS, help="ignore shorter comments")
+    parser.add_argument("--bands", type=int, default=BANDS, help=f"LSH bands, must divide {PERMUTATIONS}")
+    args = parser.parse_args()
+
+    if PERMUTATIONS % args.bands:
+        parser.error(f"--bands must divide {PERMUTATIONS}")
+
+    try:
+        rows = read_comments(args.csv, args.min_words)
+    except FileNotFoundError:
+        print(f"No {args.csv} found, run get_users_evals.py first.")
+        sys.exit(1)
+    print(f"{len(rows)} comments with at least {args.min_words} words")
+
+    a, b = hash_functions()
+    signatures = [signature(r["normalized"], a, b) for r in rows]
+    clusters, compared = find_clusters(signatures, args.bands, args.threshold)
+    in_clusters = sum(len(c) for c in clusters)
+    print(f"{len(clusters)} clusters with {in_clusters} comments ({compared} comparisons instead of "
+          f"{len(rows) * (len(rows) - 1) // 2} pairs)")
+
+    alerts = None
+    if os.path.exists(args.alerts):
+        alerts = read_alerts(args.alerts)
+        print(f"{len(alerts)} alerts joined from {args.alerts}")
+
+    export(rows, clusters, alerts, args.out)
+    print(f"Saved in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
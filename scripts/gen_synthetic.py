@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+gen_synthetic.py
+
+Synthetic campus data for stress testing the analytics offline. Writes
+users, scale_teams, locations and projects_users as JSON Lines, one API
+object per line and in the same shapes the 42 API returns, and can time the
+analytics of the other scripts over them.
+
+Users get a 42cursus level, evaluate users of similar level and a share of
+them (--colluders) keeps evaluating the same buddy, so the alert rules have
+something to find. Everything is streamed, 10M evaluations never sit in
+memory, and the same --seed always gives the same data.
+
+Uso:
+  python gen_synthetic.py generate --users 100000 --evals-per-user 100 [--out results/synthetic]
+  python gen_synthetic.py bench [--out results/synthetic]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+OUT_DIR = Path(__file__).parent / "../results/synthetic"
+CAMPUS_ID = 37
+CURSUS_ID = 21
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+DAYS = 3 * 365
+HOSTS_PER_CLUSTER = 80
+
+# (id, slug, gitlab path folder) of the projects evaluations are drawn from
+PROJECTS = [
+    (1314, "libft", "42-cursus/inner-circle"),
+    (1327, "get_next_line", "42-cursus/inner-circle"),
+    (1316, "ft_printf", "42-cursus/inner-circle"),
+    (1338, "born2beroot", "42-cursus/inner-circle"),
+    (2009, "so_long", "42-cursus/inner-circle"),
+    (2004, "pipex", "42-cursus/inner-circle"),
+    (1471, "push_swap", "42-cursus/inner-circle"),
+    (1331, "minishell", "42-cursus/inner-circle"),
+    (1334, "philosophers", "42-cursus/inner-circle"),
+    (1326, "cub3d", "42-cursus/inner-circle"),
+    (2007, "netpractice", "42-cursus/inner-circle"),
+    (1332, "webserv", "42-cursus/inner-circle"),
+    (1983, "inception", "42-cursus/inner-circle"),
+    (1337, "ft_transcendence", "42-cursus/inner-circle"),
+    (1320, "exam-rank-02", "42-cursus/inner-circle"),
+    (1255, "c-piscine-shell-00", "piscine-c"),
+    (1308, "c-piscine-rush-00", "piscine-c"),
+]
+
+
+def iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def user_login(i):
+    return f"syn{i:06d}"
+
+
+# Levels skewed to the first years of the cursus, like a real campus
+def make_users(rng, count):
+    users = []
+    for i in range(count):
+        level = round(min(21.0, rng.betavariate(1.6, 4.0) * 21), 2)
+        users.append({"id": 100000 + i, "login": user_login(i), "level": level})
+    return users
+
+
+def user_json(user):
+    return {
+        "id": user["id"],
+        "login": user["login"],
+        "campus": [{"id": CAMPUS_ID}],
+        "cursus_users": [{
+            "cursus_id": CURSUS_ID,
+            "level": user["level"],
+            "grade": "Transcender" if user["level"] >= 9 else "Learner",
+            "begin_at": iso(START),
+        }],
+    }
+
+
+def short_user(user):
+    return {"id": user["id"], "login": user["login"]}
+
+
+# Evaluations given by every user, grouped by corrector and in date order.
+# Evaluated users are drawn near the corrector's level, colluders send
+# `collusion` of theirs to one buddy.
+def scale_teams(rng, users, per_user, colluders, collusion):
+    by_level = sorted(users, key=lambda u: u["level"])
+    position = {u["id"]: i for i, u in enumerate(by_level)}
+    spread = max(5, len(users) // 20)
+    next_id = 1
+    for corrector in users:
+        count = max(0, int(rng.gauss(per_user, per_user / 3)))
+        buddy = None
+        if rng.random() < colluders:
+            buddy = by_level[rng.randrange(len(by_level))]
+        moments = sorted(rng.random() * DAYS for _ in range(count))
+        for day in moments:
+            if buddy is not None and buddy is not corrector and rng.random() < collusion:
+                evaluated = buddy
+                final_mark = 100 if rng.random() < 0.95 else rng.choice([0, 75])
+            else:
+                center = position[corrector["id"]]
+                evaluated = by_level[min(len(by_level) - 1, max(0, center + rng.randint(-spread, spread)))]
+                final_mark = rng.choice([100, 100, 100, 115, 125, 80, 0]) if rng.random() > 0.02 else None
+            if evaluated is corrector:
+                continue
+            project_id, slug, folder = rng.choice(PROJECTS)
+            created = START + timedelta(days=day)
+            yield {
+                "id": next_id,
+                "scale_id": project_id,
+                "comment": f"Synthetic review of {slug}.",
+                "created_at": iso(created),
+                "updated_at": iso(created + timedelta(minutes=30)),
+                "feedback": "Good evaluation.",
+                "final_mark": final_mark,
+                "flag": {"id": 1, "name": "Ok", "positive": True},
+                "begin_at": iso(created - timedelta(minutes=15)),
+                "cursus_id": CURSUS_ID,
+                "corrector": short_user(corrector),
+                "correcteds": [short_user(evaluated)],
+                "team": {
+                    "id": 500000 + next_id,
+                    "name": f"{evaluated['login']}'s group",
+                    "project_id": project_id,
+                    "project_gitlab_path": f"pedago_world/{folder}/{slug}",
+                    "final_mark": final_mark,
+                    "status": "finished",
+                },
+            }
+            next_id += 1
+
+
+# Logtime sessions of every user, the last one of some users still open
+def locations(rng, users, per_user):
+    next_id = 1
+    for user in users:
+        count = max(0, int(rng.gauss(per_user, per_user / 3)))
+        for n, day in enumerate(sorted(rng.random() * DAYS for _ in range(count))):
+            begin = START + timedelta(days=day)
+            still_open = n == count - 1 and rng.random() < 0.1
+            yield {
+                "id": next_id,
+                "begin_at": iso(begin),
+                "end_at": None if still_open else iso(begin + timedelta(minutes=rng.randint(10, 10 * 60))),
+                "primary": True,
+                "host": f"c{rng.randint(1, 3)}r{rng.randint(1, 10)}s{rng.randint(1, HOSTS_PER_CLUSTER // 10)}",
+                "campus_id": CAMPUS_ID,
+                "user": short_user(user),
+            }
+            next_id += 1
+
+
+# common_core first, then the projects finished one after the other
+def projects_users(rng, users, per_user):
+    next_id = 1
+    inner = [p for p in PROJECTS if p[2] == "42-cursus/inner-circle"]
+    for user in users:
+        moment = START + timedelta(days=rng.randint(0, 90))
+        entries = [(0, "common_core", moment, moment)]
+        for project_id, slug, _ in inner[:rng.randint(0, min(per_user, len(inner)))]:
+            end = moment + timedelta(days=rng.randint(7, 90))
+            entries.append((project_id, slug, moment, end))
+            moment = end
+        for project_id, slug, begin, end in entries:
+            yield {
+                "id": next_id,
+                "occurrence": 0,
+                "final_mark": 100 if project_id else None,
+                "status": "finished",
+                "validated?": True if project_id else None,
+                "current_team_id": 500000 + next_id,
+                "project": {"id": project_id, "name": slug, "slug": slug, "parent_id": None},
+                "cursus_ids": [CURSUS_ID],
+                "begin_at": iso(begin),
+                "end_at": iso(end),
+                "marked_at": iso(end),
+                "created_at": iso(begin),
+                "user": short_user(user),
+            }
+            next_id += 1
+
+
+def write_jsonl(path, records):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    users = make_users(rng, args.users)
+
+    started = time.perf_counter()
+    for name, records in (
+        ("users", (user_json(u) for u in users)),
+        ("scale_teams", scale_teams(rng, users, args.evals_per_user, args.colluders, args.collusion)),
+        ("locations", locations(rng, users, args.locations_per_user)),
+        ("projects_users", projects_users(rng, users, args.projects_per_user)),
+    ):
+        count = write_jsonl(out / f"{name}.jsonl", records)
+        print(f"{count:>10} {name:<15} ({time.perf_counter() - started:.1f}s)")
+        started = time.perf_counter()
+
+
+# Runs fn with its prints discarded (the scripts print one line per evaluation)
+def timed(label, fn, *args):
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = fn(*args)
+    print(f"{label:<45} {time.perf_counter() - started:8.2f}s")
+    return result
+
+
+# Consecutive records with the same key, as lists (files are written grouped)
+def grouped(records, key):
+    group, current = [], None
+    for record in records:
+        k = key(record)
+        if group and k != current:
+            yield current, group
+            group = []
+        current = k
+        group.append(record)
+    if group:
+        yield current, group
+
+
+def bench(args):
+    import api_client
+    import get_evals
+    import get_user_eval
+    import logged_hours
+    import rythm
+
+    out = Path(args.out)
+    if not (out / "users.jsonl").exists():
+        print(f"No synthetic data in {out}, run the generate command first.")
+        sys.exit(1)
+
+    # no network: token requests get a placeholder and any other request fails
+    api_client.MODE = "replay"
+    # levels come from the file, so no profile request is made
+    levels = {u["login"]: u["cursus_users"][0]["level"] for u in read_jsonl(out / "users.jsonl")}
+    get_evals.user_levels.update(levels)
+    get_user_eval.user_levels.update(levels)
+    get_evals.DESTINY_FILE = str(out / "bench_alerts.xlsx")
+    get_evals.PAIR_COUNTS_FILE = str(out / "bench_pair_counts.json")
+    print(f"{len(levels)} users")
+
+    def given():
+        for evaluator, evals in grouped(read_jsonl(out / "scale_teams.jsonl"), lambda e: e["corrector"]["login"]):
+            get_evals.process_evaluations(evals, evaluator, {})
+
+    def received():
+        for e in read_jsonl(out / "scale_teams.jsonl"):
+            get_user_eval.process_received_evaluations([e], e["correcteds"][0]["login"], {})
+
+    def hours():
+        return [logged_hours.calc_hours(locs)
+                for _, locs in grouped(read_jsonl(out / "locations.jsonl"), lambda l: l["user"]["id"])]
+
+    def durations():
+        return [rythm.project_durations(login, projects, verbose=False)
+                for login, projects in grouped(read_jsonl(out / "projects_users.jsonl"), lambda p: p["user"]["login"])]
+
+    timed("get_evals.process_evaluations", given)
+    timed("get_evals.export_alerts_report", get_evals.export_alerts_report, args.jobs)
+    timed("get_user_eval.process_received_evaluations", received)
+    timed("get_user_eval.check_alerts", get_user_eval.check_alerts, "synthetic")
+    timed("logged_hours.calc_hours", hours)
+    timed("rythm.project_durations", durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic campus data and time the analytics over it.")
+    parser.add_argument("command", choices=["generate", "bench"])
+    parser.add_argument("--out", default=str(OUT_DIR), help=f"data folder (default {OUT_DIR})")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--evals-per-user", type=int, default=100, help="evaluations given per user on average")
+    parser.add_argument("--locations-per-user", type=int, default=200)
+    parser.add_argument("--projects-per-user", type=int, default=8)
+    parser.add_argument("--colluders", type=float, default=0.02, help="share of users with a buddy")
+    parser.add_argument("--collusion", type=float, default=0.3, help="share of a colluder's evaluations to the buddy")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="processes for export_alerts_report in bench")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate(args)
+    else:
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 import requests
 import json
+import os
+import api_client
+import snapshots
 
 BASE_URL = "https://api.intra.42.fr/v2/campus"
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")  # token printed by get_token.py
 HEADERS = {
     "Authorization": f"Bearer {ACCESS_TOKEN}"
 }
@@ -14,7 +18,7 @@ def get_all_paginated(endpoint, params=None):
     page = 1
     while True:
         params.update({"page": page, "per_page": 100})  # 100 items per page
-        response = requests.get(endpoint, headers=HEADERS, params=params)
+        response = api_client.get(endpoint, headers=HEADERS, params=params)
 
         try:
             response.raise_for_status()
@@ -41,5 +45,10 @@ def main():
     save_in_json("campus_completo.json", all_campus)
     print(f"\nSaved in 'campus_completo.json' with {len(all_campus)} registered.")
 
+    changes = snapshots.save_and_diff("campus", all_campus, "id", ["name", "users_count", "active"])
+    if changes is not None:
+        print("Changes since the previous snapshot:")
+        snapshots.print_diff(changes, "id")
+
 if __name__ == "__main__":
     main()
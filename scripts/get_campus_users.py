@@ -1,9 +1,15 @@
-import requests
+import sys
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pathlib import Path
+import api_client
+from rate_budget import RateBudget
+import user_index
+import snapshots
 
 load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
 
@@ -13,15 +19,20 @@ BASE_URL = "https://api.intra.42.fr"
 uid = os.getenv("UID")
 secret = os.getenv("SECRET")
 
-CAMPUS_API_URL = os.getenv("CAMPUS_API_URL", f"{API_BASE}/campus/37/users") # Malaga campus by default
+CAMPUS_ID = os.getenv("CAMPUS_ID", "37") # Malaga campus by default
+CAMPUS_API_URL = os.getenv("CAMPUS_API_URL", f"{API_BASE}/campus/{CAMPUS_ID}/users")
+MINIMUM_DATE = os.getenv("MINIMUM_DATE", "2022-01-08T00:00:00Z") # users created before are skipped
 OUTPUT_FILE = "users/all_campus_users.txt"
+CHANGED_FILE = "users/changed_campus_users.txt"  # new users and users whose grade or level changed
+CAMPUS_FILE = "users/campus_{}_users.txt"  # one per campus with --campuses
 REQUEST_DELAY = 0.5  # delay between requests to avoid rate limiting
+CAMPUS_WORKERS = 4  # campuses processed at the same time with --campuses
 
 def get_token(uid, secret):
     print("get_token -> UID:", uid)
     print("get_token -> SECRET mask:", (secret[:4] + "..." + secret[-4:]) if secret else None)
 
-    res = requests.post(f"{BASE_URL}/oauth/token", data={
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
         "grant_type": "client_credentials",
         "client_id": uid,
         "client_secret": secret,
@@ -39,10 +50,13 @@ def get_token(uid, secret):
 # Consults the user profile and extracts their grade from cursus 21 (42cursus).
 # Returns the grade or None if it doesn't exist.
 def get_user_grade(login, token):
+    found, grade = user_index.cached_grade(login)
+    if found:
+        return grade
     url = f"{API_BASE}/users/{login}"
     headers = {"Authorization": f"Bearer {token}"}
     try:
-        res = requests.get(url, headers=headers, timeout=15)
+        res = api_client.get(url, headers=headers, timeout=15)
         if res.status_code == 404:
             return None
         res.raise_for_status()
@@ -51,87 +65,275 @@ def get_user_grade(login, token):
         # search the grade in cursus_users for cursus_id 21
         for cu in data.get("cursus_users", []):
             if cu.get("cursus_id") == 21:
+                user_index.remember(login, data["id"], cu.get("level"), grade=cu.get("grade"))
                 return cu.get("grade")  # can be Cadet, Transcender, etc...
     except Exception:
         pass
     return None
 
+# Filter, range and sort parameters so the API only sends the users we keep.
+# Dates are ISO 8601 strings, created_before defaults to now.
+def campus_users_params(created_after=MINIMUM_DATE, created_before=None,
+                        pool_year=None, pool_month=None, active_only=True):
+    params = {"sort": "created_at"}
+    if active_only:
+        params["filter[active?]"] = "true"
+    if created_after:
+        created_before = created_before or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        params["range[created_at]"] = f"{created_after},{created_before}"
+    if pool_year:
+        params["filter[pool_year]"] = pool_year
+    if pool_month:
+        params["filter[pool_month]"] = pool_month
+    return params
+
+# range[created_at] is inclusive, users created exactly at the minimum date are
+# dropped here so the listing stays strictly after it, as it always was
+def created_after_minimum(user, minimum_date):
+    if minimum_date is None:
+        return True
+    created_at = user.get("created_at")
+    if not created_at:
+        return False
+    return datetime.fromisoformat(created_at.replace("Z", "+00:00")) > minimum_date
+
+# --created-after as an aware datetime, a date or time without offset is taken as UTC
+def parse_minimum_date(created_after):
+    if not created_after:
+        return None
+    minimum_date = datetime.fromisoformat(created_after.replace("Z", "+00:00"))
+    if minimum_date.tzinfo is None:
+        minimum_date = minimum_date.replace(tzinfo=timezone.utc)
+    return minimum_date
+
 # Goes through all pages of the campus endpoint and returns
-# a list of active logins created after minimun_date.
-def fetch_campus_users(token):
+# the logins matching the filters (active users created after MINIMUM_DATE by default).
+# A page that still fails after the api_client retries raises RuntimeError.
+def fetch_campus_users(token, campus_url=CAMPUS_API_URL, active_only=True, prefix="", **filters):
     page = 1
     per_page = 100
     all_active_logins = []
-    minimum_date = datetime.fromisoformat("2022-01-08T00:00:00+00:00")
+    filter_params = campus_users_params(active_only=active_only, **filters)
+    created_after = filters.get("created_after", MINIMUM_DATE)
+    minimum_date = parse_minimum_date(created_after)
     
     headers = {"Authorization": f"Bearer {token}"}
     
     while True:
         params = {
+            **filter_params,
             "page": page,
             "per_page": per_page
         }
 
-        response = requests.get(CAMPUS_API_URL, headers=headers, params=params)
+        response = api_client.get(campus_url, headers=headers, params=params)
 
+        # api_client already retried 429s, a missing page would leave the listing short
         if response.status_code != 200:
-            print(f"Error in page {page}: {response.status_code}")
-            break
+            raise RuntimeError(f"Error in page {page}: {response.status_code}")
 
         data = response.json()
 
         if not data:
             break  # No more users to process
 
-        active_users = [user for user in data if user.get("active?") == True]
+        # the API already filtered the page, this only guards against ignored filters
+        active_users = [user for user in data if not active_only or user.get("active?") is not False]
 
         for user in active_users:
-            created_at_str = user.get("created_at")
-            if created_at_str:
-                created_at = datetime.fromisoformat(created_at_str.replace("Z", "+00:00"))
-                if created_at > minimum_date:
-                    login = user.get("login")
-                    if login:
-                        all_active_logins.append(login)
-
-        print(f"Page {page} processed: {len(active_users)} active users found.")
+            login = user.get("login")
+            if login and created_after_minimum(user, minimum_date):
+                all_active_logins.append(login)
+
+        print(f"{prefix}Page {page} processed: {len(active_users)} active users found.")
         page += 1
     
     return all_active_logins
 
-def main():
-    try:
-        token = get_token(uid, secret)
-    except Exception as e:
-        print(f"[ERROR] Cannot obtain token: {e}")
-        return
+# Ids of every active campus of the campus listing
+def fetch_campus_ids(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = []
+    page = 1
+    while True:
+        response = api_client.get(f"{API_BASE}/campus", headers=headers, params={"page": page, "per_page": 100})
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            break
+        ids.extend(c["id"] for c in data if c.get("active") is not False)
+        page += 1
+    return ids
 
-    print("\n---Obtaining users ffrom campus--")
-    all_active_logins = fetch_campus_users(token)
-    
-    print(f"\Obtaining grades for {len(all_active_logins)} users ...")
+# Grade of every login, as (login, grade) with "N/A" or "ERROR" when missing.
+# delay is the pause after each user when nothing else paces the requests.
+def fetch_grades(logins, token, prefix="", delay=REQUEST_DELAY):
     results = []
-    for i, login in enumerate(all_active_logins, 1):
-        print(f"[{i}/{len(all_active_logins)}] {login} ...", end=" ")
+    for i, login in enumerate(logins, 1):
         try:
             grade = get_user_grade(login, token)
             if grade:
                 results.append((login, grade))
-                print(f"FOUND : {grade}")
+                print(f"{prefix}[{i}/{len(logins)}] {login} ... FOUND : {grade}")
             else:
                 results.append((login, "N/A"))
-                print("N/A")
+                print(f"{prefix}[{i}/{len(logins)}] {login} ... N/A")
         except Exception as ex:
-            print(f"ERR: {ex}")
+            print(f"{prefix}[{i}/{len(logins)}] {login} ... ERR: {ex}")
             results.append((login, "ERROR"))
-        time.sleep(REQUEST_DELAY)
+        if delay:
+            time.sleep(delay)
+    return results
+
+# (login, grade) of a listing written by save_results, or None when it does not exist
+def read_results(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [tuple(line.rstrip("\n").split("\t")[:2]) for line in f if line.strip()]
+    except FileNotFoundError:
+        return None
+
+def save_results(results, path=OUTPUT_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        for login, grade, *campus in results:
+            f.write("\t".join([login, grade] + [str(c) for c in campus]) + "\n")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="List campus users and their 42cursus grade.")
+    parser.add_argument("--campus", help=f"campus id (default {CAMPUS_ID}, or CAMPUS_API_URL)")
+    parser.add_argument("--campuses", help="comma-separated campus ids, or 'all' for every active campus")
+    parser.add_argument("--workers", type=int, default=CAMPUS_WORKERS,
+                        help=f"campuses processed at the same time with --campuses (default {CAMPUS_WORKERS})")
+    parser.add_argument("--created-after", default=MINIMUM_DATE,
+                        help=f"only users created after this ISO date (default {MINIMUM_DATE})")
+    parser.add_argument("--created-before", help="only users created before this ISO date (default now)")
+    parser.add_argument("--pool-year", help="only users of this pool year, e.g. 2023")
+    parser.add_argument("--pool-month", help="only users of this pool month, e.g. september")
+    parser.add_argument("--include-inactive", action="store_true", help="keep inactive users too")
+    return parser.parse_args()
+
+def user_filters(args):
+    return {
+        "created_after": args.created_after,
+        "created_before": args.created_before,
+        "pool_year": args.pool_year,
+        "pool_month": args.pool_month,
+        "active_only": not args.include_inactive,
+    }
+
+def main():
+    args = parse_args()
+    campus_url = f"{API_BASE}/campus/{args.campus}/users" if args.campus else CAMPUS_API_URL
+
+    try:
+        token = get_token(uid, secret)
+    except Exception as e:
+        print(f"[ERROR] Cannot obtain token: {e}")
+        return
+
+    if args.campuses:
+        return fan_out(args, token)
+
+    print("\n---Obtaining users ffrom campus--")
+    try:
+        all_active_logins = fetch_campus_users(token, campus_url, **user_filters(args))
+    except RuntimeError as e:
+        print(f"[ERROR] {e}, {OUTPUT_FILE} left as it was")
+        sys.exit(1)
+    
+    print(f"\Obtaining grades for {len(all_active_logins)} users ...")
+    results = fetch_grades(all_active_logins, token)
 
     # Save in a file with grade
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        for login, grade in results:
-            f.write(f"{login}\t{grade}\n")
+    save_results(results)
 
     print(f"\Total of logins saved: {len(results)} in {OUTPUT_FILE}")
 
+    save_changes(results)
+
+# Users and grades of one campus, saved in its own file and snapshot
+def process_campus(campus_id, token, filters):
+    prefix = f"[campus {campus_id}] "
+    logins = fetch_campus_users(token, f"{API_BASE}/campus/{campus_id}/users", prefix=prefix, **filters)
+    print(f"{prefix}Obtaining grades for {len(logins)} users ...")
+    results = fetch_grades(logins, token, prefix, delay=0)
+    path = CAMPUS_FILE.format(campus_id)
+    save_results(results, path)
+    print(f"{prefix}{len(results)} logins saved in {path}")
+    changed = save_changes(results, f"campus_users_{campus_id}", None, prefix)
+    return results, changed
+
+# Every campus in its own worker. The workers share one rate budget
+# (rate_budget.RateBudget, or the gateway itself when API_GATEWAY_URL is set)
+# instead of sleeping after each user, so together they use the whole budget
+# of the app and never more.
+def fan_out(args, token):
+    if args.campuses.strip().lower() == "all":
+        campus_ids = fetch_campus_ids(token)
+    else:
+        campus_ids = [c.strip() for c in args.campuses.split(",") if c.strip()]
+    if not api_client.GATEWAY_URL:
+        api_client.throttle = RateBudget().acquire
+    print(f"\n---Obtaining users from {len(campus_ids)} campuses with {args.workers} workers--")
+
+    filters = user_filters(args)
+    merged, changed, missing = [], [], []
+    compared = False
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {c: pool.submit(process_campus, c, token, filters) for c in campus_ids}
+        for campus_id, future in futures.items():
+            try:
+                results, campus_changed = future.result()
+            except Exception as e:
+                print(f"[campus {campus_id}] ERR: {e}")
+                # its snapshot was not updated, the next run reports its changes
+                previous = read_results(CAMPUS_FILE.format(campus_id))
+                if previous is None:
+                    missing.append(campus_id)
+                else:
+                    print(f"[campus {campus_id}] keeping the {len(previous)} logins of the previous run")
+                    merged.extend((login, grade, campus_id) for login, grade in previous)
+                continue
+            merged.extend((login, grade, campus_id) for login, grade in results)
+            # a campus seen for the first time is new as a whole
+            compared = compared or campus_changed is not None
+            changed.extend((login, grade, campus_id) for login, grade in
+                           (results if campus_changed is None else campus_changed))
+
+    if missing:
+        # a partial merged listing would silently drop those users downstream
+        print(f"[ERROR] No listing for campus {', '.join(str(c) for c in missing)}, "
+              f"{OUTPUT_FILE} and {CHANGED_FILE} left as they were")
+        sys.exit(1)
+
+    # merged listing: login, grade and campus id, so get_transcenders.py reads it as usual
+    save_results(merged)
+    print(f"\nTotal of logins saved: {len(merged)} from {len(campus_ids)} campuses in {OUTPUT_FILE}")
+    if compared:
+        save_results(changed, CHANGED_FILE)
+        print(f"{len(changed)} changed logins saved in {CHANGED_FILE}")
+
+# Snapshots the listing and writes the logins that changed since the previous run,
+# so the sweeps that follow can work on the delta only. Returns the changed
+# (login, grade), or None on the first snapshot.
+def save_changes(results, name="campus_users", changed_file=CHANGED_FILE, prefix=""):
+    records = []
+    for login, grade in results:
+        entry = user_index.cached_entry(login) or {}
+        records.append({"login": login, "grade": grade, "level": entry.get("level")})
+
+    changes = snapshots.save_and_diff(name, records, "login", ["grade", "level"])
+    if changes is None:
+        print(f"{prefix}First snapshot of the campus users, no changes to report.")
+        return None
+    snapshots.print_diff(changes, "login")
+
+    grades = dict(results)
+    changed = [(login, grades[login]) for login in snapshots.changed_keys(changes, "login")]
+    if changed_file:
+        save_results(changed, changed_file)
+        print(f"Changed logins saved in {changed_file}")
+    return changed
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,10 +2,17 @@ import requests
 from collections import defaultdict, Counter
 from openpyxl import Workbook
 import os
+import math
 import time
 import json
+import argparse
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from pathlib import Path
+import api_client
+import project_catalog
+import user_index
+import parallel
 
 load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
 
@@ -21,6 +28,20 @@ secret = os.getenv("SECRET")
 # CONFIGURATION
 ORIGIN_FILE = "kickoff_actual.txt"
 DESTINY_FILE = "resultados_kickoff_noviembre.xlsx"
+WATCH_INTERVAL = 900  # seconds between polls in --watch mode
+PAIR_COUNTS_FILE = "results/pair_counts.json"  # counts and levels behind the last report
+WINDOW_FILE = "results/window_alerts.xlsx"  # --window-days report
+
+# Alert rule: threshold = BASE_THRESHOLD up to BASE_LEVEL, round(level - LEVEL_OFFSET) above.
+# With more than TOTAL_CUTOFF evaluations a pair over SHARE of them gets PENALTY_HIGH, the rest PENALTY_LOW.
+MIN_TIMES = 1  # pairs with this many evaluations or fewer never alert
+BASE_THRESHOLD = 3
+BASE_LEVEL = 2
+LEVEL_OFFSET = 1
+TOTAL_CUTOFF = 11
+SHARE = 0.10
+PENALTY_HIGH = 5
+PENALTY_LOW = -2
 
 # Colors
 class Color:
@@ -34,15 +55,19 @@ class Color:
 # Data Storage Structures.
 evaluations_map = defaultdict(Counter)  # evaluator-> {evaluated -> times}
 user_levels = {}  # login -> level
+scale_team_deltas = {}  # (scale_team id, evaluator) -> [(evaluated, delta)] already counted
+scale_team_dates = {}  # scale_team id -> created_at
+evaluated_ids = {}  # login -> user id, from the correcteds of the scale_teams
+LEVELS_BATCH = 100  # user ids per cursus_users request
 
 # Safe request with delays
 def safe_request(method, url, headers=None, params=None, data=None, retries=5, delay=3):
     for attempt in range(retries):
         try:
             if method.lower() == 'get':
-                return requests.get(url, headers=headers, params=params, timeout=10)
+                return api_client.get(url, headers=headers, params=params, timeout=10)
             elif method.lower() == 'post':
-                return requests.post(url, headers=headers, data=data, timeout=10)
+                return api_client.post(url, headers=headers, data=data, timeout=10)
         except requests.exceptions.RequestException as e:
             print(f"{Color.YELLOW}   REattampt {attempt + 1}/{retries} because of connection error: {e}{Color.RESET}")
             time.sleep(delay)
@@ -53,7 +78,7 @@ def get_token(uid, secret):
     print("get_token -> UID:", uid)
     print("get_token -> SECRET mask:", (secret[:4] + "..." + secret[-4:]) if secret else None)
 
-    res = requests.post(f"{BASE_URL}/oauth/token", data={
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
         "grant_type": "client_credentials",
         "client_id": uid,
         "client_secret": secret,
@@ -70,6 +95,10 @@ def get_token(uid, secret):
 
 # User data (ID and cursus level)
 def get_user_data(username, headers):
+    entry = user_index.cached_entry(username)
+    if entry:
+        return entry["id"], entry.get("level")
+
     resp = safe_request('get', f"{API_BASE}/users/{username}", headers=headers)
     resp.raise_for_status()
     data = resp.json()
@@ -80,10 +109,11 @@ def get_user_data(username, headers):
             level = cursus.get("level")
             time.sleep(1)
             break
+    user_index.remember(username, data["id"], level)
     return data["id"], level
 
 # Get evals that a given user did to others
-def get_given_evaluations(user_id, headers):
+def get_given_evaluations(user_id, headers, extra_params=None):
     page = 1
     all_evals = []
     while True:
@@ -94,7 +124,8 @@ def get_given_evaluations(user_id, headers):
             params={
                 "filter[user_id]": user_id,
                 "page[size]": 100,
-                "page[number]": page
+                "page[number]": page,
+                **(extra_params or {})
             }
         )
         if resp.status_code != 200:
@@ -125,51 +156,297 @@ def process_evaluations(evals, evaluator, headers):
         return
 
     for e in evals:
+        # an updated scale_team replaces what it counted before
+        forget_evaluation(e.get("id"), evaluator)
+        deltas = []
 
         final_mark = e.get("final_mark")
 
-        team = e.get("team", {})
-        project_name = "Desconocido"
-
-        if "project" in team and isinstance(team["project"], dict):
-            project_name = team["project"].get("name", "Desconocido")
-        elif "project_gitlab_path" in team:
-            # path as project name, possible solution
-            project_name = team["project_gitlab_path"].split("/")[-1]
+        project_id, project_name = project_catalog.team_project(e.get("team", {}))
+        project_name = project_name or "Desconocido"
 
         cursus_id = e.get("cursus_id", "N/A")
-        
-        # new filter for cursus
-        if any(keyword in project_name for keyword in ["piscine", "rush", "exam", "shell-","c-"]):
+
+        # only the categories in project_catalog.INCLUDED count (no piscine, exam or rush)
+        if not project_catalog.included(project_id, project_name):
             continue
 
         for user in e.get("correcteds", []):
             evaluated = user.get("login")
 
+            # the level of the evaluated is resolved later, only if the pair can alert
             if evaluated and evaluated != evaluator:
-                if evaluated not in user_levels:
-                    try:
-                        _, level = get_user_data(evaluated, headers)
-                        user_levels[evaluated] = level
-                    except:
-                        user_levels[evaluated] = None
-
-                level = user_levels[evaluated]
-                if level is None:
-                    continue
+                if user.get("id") is not None:
+                    evaluated_ids[evaluated] = user["id"]
 
                 if final_mark is not None:
                     delta = 1 if final_mark >= 100 else -1
                     evaluations_map[evaluator][evaluated] += delta
+                    deltas.append((evaluated, delta))
                     print(f"{Color.CYAN} Evaluated: {evaluated}, Final grade: {final_mark}{Color.RESET}")
                 else:
                    print(f"{Color.YELLOW}   Without final grade {evaluated} (Proyect: '{project_name}', Cursus ID: {cursus_id}){Color.RESET}")
 
-# Export the alerts if there are any
-def export_alerts_report():
+        if deltas and e.get("id") is not None:
+            scale_team_deltas[(e["id"], evaluator)] = deltas
+            scale_team_dates[e["id"]] = e.get("created_at")
+
+# Undo the counts of a scale_team processed before for the same evaluator
+def forget_evaluation(scale_team_id, evaluator):
+    deltas = scale_team_deltas.pop((scale_team_id, evaluator), None)
+    if deltas is None:
+        return
+    for evaluated, delta in deltas:
+        evaluations_map[evaluator][evaluated] -= delta
+
+# Pairs of an evaluator whose evaluated has a 42cursus level. Evaluated users
+# without one are not counted, as before levels were resolved lazily.
+def known_counter(evaluator):
+    return {evaluated: times for evaluated, times in evaluations_map[evaluator].items()
+            if user_levels.get(evaluated) is not None}
+
+# Applies the alert rule to the pairs of one evaluator. Call resolve_alert_levels() first.
+# Returns (evaluated, times, percent, adjusted_times) for every pair over the threshold.
+def evaluator_alerts(evaluator):
+    eval_level = user_levels.get(evaluator)
+    if eval_level is None:
+        return []
+    return pair_alerts(eval_level, known_counter(evaluator))
+
+# Whether a pair can alert for some total in [low, high]. The rule only
+# changes at the cutoff and where the share crosses SHARE, so checking the
+# ends of the range and both sides of those points covers every case.
+def can_alert(eval_level, times, low, high):
+    if times <= MIN_TIMES:
+        return False
+    share_edge = math.ceil(times / SHARE) - 1  # last total with times / total > SHARE
+    totals = {low, high, TOTAL_CUTOFF, TOTAL_CUTOFF + 1, share_edge, share_edge + 1}
+    return any(pair_alert(eval_level, times, total) for total in totals if low <= total <= high)
+
+# Evaluated users whose level is still needed: every unresolved evaluated of
+# an evaluator that may have an alert. Evaluators none of whose pairs can
+# alert, whatever the unresolved levels turn out to be, need no lookup.
+def levels_needed(evaluators):
+    needed = set()
+    for evaluator in evaluators:
+        eval_level = user_levels.get(evaluator)
+        if eval_level is None:
+            continue
+        counter = evaluations_map[evaluator]
+        unknown = [e for e in counter if e not in user_levels]
+        if not unknown:
+            continue
+        low = sum(abs(t) for e, t in counter.items() if user_levels.get(e) is not None)
+        high = low + sum(abs(counter[e]) for e in unknown)
+        if any(can_alert(eval_level, times, low, high)
+               for evaluated, times in counter.items()
+               if evaluated not in user_levels or user_levels[evaluated] is not None):
+            needed.update(unknown)
+    return needed
+
+# Levels of many users: the user index first, then one cursus_users request
+# per LEVELS_BATCH ids. Users without a 42cursus entry get None.
+def resolve_levels(logins, headers):
+    pending = []
+    for login in logins:
+        if login in user_levels:
+            continue
+        entry = user_index.cached_entry(login)
+        if entry:
+            user_levels[login] = entry.get("level")
+        else:
+            pending.append(login)
+    if not pending:
+        return
+
+    if headers is None:
+        headers = {"Authorization": f"Bearer {get_token(uid, secret)}"}
+
+    by_id = {evaluated_ids[login]: login for login in pending if login in evaluated_ids}
+    ids = list(by_id)
+    for start in range(0, len(ids), LEVELS_BATCH):
+        batch = ids[start:start + LEVELS_BATCH]
+        resp = safe_request('get', f"{API_BASE}/cursus/21/cursus_users", headers=headers, params={
+            "filter[user_id]": ",".join(str(i) for i in batch),
+            "page[size]": LEVELS_BATCH,
+        })
+        resp.raise_for_status()
+        found = {}
+        for cursus_user in resp.json():
+            user_id = (cursus_user.get("user") or {}).get("id")
+            if user_id in by_id:
+                found[user_id] = cursus_user
+        for user_id in batch:
+            login = by_id[user_id]
+            cursus_user = found.get(user_id, {})
+            user_levels[login] = cursus_user.get("level")
+            user_index.remember(login, user_id, cursus_user.get("level"), grade=cursus_user.get("grade"))
+        time.sleep(0.5)
+
+    # logins seen without an id are looked up one by one
+    for login in pending:
+        if login not in user_levels:
+            try:
+                _, user_levels[login] = get_user_data(login, headers)
+            except Exception:
+                user_levels[login] = None
+
+# Resolves, in batches, just the levels the alert rule needs for `evaluators`
+def resolve_alert_levels(evaluators, headers=None):
+    needed = levels_needed(evaluators)
+    if needed:
+        print(f"{Color.WHITE}Resolving {len(needed)} levels for the pairs that can alert{Color.RESET}")
+        resolve_levels(needed, headers)
+    return len(needed)
+
+# Same rule without module state, so it can run in worker processes
+def pair_alerts(eval_level, counter):
+    total_evals = sum(abs(v) for v in counter.values())
+
+    alerts = []
+    for evaluated, times in counter.items():
+        alert = pair_alert(eval_level, times, total_evals)
+        if alert:
+            alerts.append((evaluated, times) + alert)
+    return alerts
+
+# Adjusted evaluations a pair must go over for an evaluator of eval_level
+def alert_threshold(eval_level):
+    return BASE_THRESHOLD if eval_level <= BASE_LEVEL else round(eval_level - LEVEL_OFFSET)
+
+# The rule for a single pair. Returns (percent, adjusted_times) when it alerts, else None.
+def pair_alert(eval_level, times, total_evals):
+    if times <= MIN_TIMES:
+        return None
+
+    threshold = alert_threshold(eval_level)
+    porcentaje = times / total_evals if total_evals > 0 else 0
+    if total_evals > TOTAL_CUTOFF:
+        penalization = PENALTY_HIGH if porcentaje > SHARE else PENALTY_LOW
+    else:
+        penalization = 0
+
+    adjusted_times = times + penalization
+
+    if adjusted_times > threshold:
+        return porcentaje, adjusted_times
+    return None
+
+def to_epoch(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+# Applies the rule over sliding windows of window_days. Every evaluated level must be resolved. Evaluations are sorted
+# by created_at and the evaluator x evaluated counts are updated when an
+# evaluation enters or leaves the window. The rule depends on the evaluator's
+# window total too, so when the total changes every pair of that evaluator in
+# the window is re-checked, otherwise only the pair that changed. A pair alerts
+# once per burst: it can alert again after dropping below the threshold.
+def window_alerts(window_days):
+    events = []
+    for (scale_team_id, evaluator), deltas in scale_team_deltas.items():
+        created_at = scale_team_dates.get(scale_team_id)
+        if not created_at or user_levels.get(evaluator) is None:
+            continue
+        for evaluated, delta in deltas:
+            if user_levels.get(evaluated) is None:
+                continue
+            events.append((to_epoch(created_at), evaluator, evaluated, delta))
+    events.sort()
+
+    window = window_days * 86400
+    counts = defaultdict(Counter)  # evaluator -> {evaluated -> times} inside the window
+    totals = Counter()  # evaluator -> sum of abs(times) inside the window
+    active = set()  # pairs alerting right now
+    alerts = []
+
+    def check(evaluator, evaluated, now):
+        times = counts[evaluator][evaluated]
+        pair = (evaluator, evaluated)
+        alert = pair_alert(user_levels[evaluator], times, totals[evaluator])
+        if alert and pair not in active:
+            active.add(pair)
+            alerts.append({
+                "evaluator": evaluator, "evaluator_level": user_levels[evaluator],
+                "evaluated": evaluated, "evaluated_level": user_levels.get(evaluated),
+                "window_start": datetime.fromtimestamp(now - window, timezone.utc),
+                "window_end": datetime.fromtimestamp(now, timezone.utc),
+                "times": times, "percent": alert[0], "adjusted": alert[1],
+            })
+        elif not alert:
+            active.discard(pair)
+
+    def update(evaluator, evaluated, delta, now):
+        counter = counts[evaluator]
+        before = counter[evaluated]
+        after = before + delta
+        counter[evaluated] = after
+        totals[evaluator] += abs(after) - abs(before)
+
+        for pair_evaluated in (list(counter) if abs(after) != abs(before) else [evaluated]):
+            check(evaluator, pair_evaluated, now)
+        if after == 0:
+            del counter[evaluated]  # pairs that left the window are not re-checked again
+
+    first = 0
+    for moment, evaluator, evaluated, delta in events:
+        while events[first][0] <= moment - window:
+            _, old_evaluator, old_evaluated, old_delta = events[first]
+            update(old_evaluator, old_evaluated, -old_delta, moment)
+            first += 1
+        update(evaluator, evaluated, delta, moment)
+    return alerts
+
+def export_window_report(window_days, headers=None):
+    # any pair can alert inside some window, so no level is skipped here
+    resolve_levels({evaluated for deltas in scale_team_deltas.values() for evaluated, _ in deltas}, headers)
+    alerts = window_alerts(window_days)
+    if not alerts:
+        print(f"\n{Color.GREEN}No alerts in any {window_days}-day window{Color.RESET}")
+        return
+
     wb = Workbook()
     ws = wb.active
-    ws.title = "Alerts"
+    ws.title = f"Alerts {window_days}d"
+    ws.append([
+        "Evaluator", "Evaluator Level",
+        "Evaluated", "Evaluated Level",
+        "Window Start", "Window End",
+        "Number of Evaluations", "% of Window", "Adjusted"
+    ])
+    for a in alerts:
+        ws.append([
+            a["evaluator"], a["evaluator_level"],
+            a["evaluated"], a["evaluated_level"],
+            a["window_start"].strftime("%Y-%m-%d"), a["window_end"].strftime("%Y-%m-%d"),
+            a["times"], f"{a['percent']:.0%}", a["adjusted"]
+        ])
+    os.makedirs(os.path.dirname(WINDOW_FILE) or ".", exist_ok=True)
+    wb.save(WINDOW_FILE)
+    print(f"\n{Color.RED}{len(alerts)} window alerts registered in {WINDOW_FILE}{Color.RESET}")
+
+# Stores the pair counts and levels so the rule can be re-evaluated offline (sweep_thresholds.py)
+# The sweep may loosen the rule, so the levels skipped by the report are
+# resolved here first and every pair of an evaluator with a level is saved.
+def save_pair_counts(path=None, headers=None):
+    path = path or PAIR_COUNTS_FILE
+    evaluators = [e for e in evaluations_map if user_levels.get(e) is not None]
+    resolve_levels({evaluated for e in evaluators for evaluated in evaluations_map[e]}, headers)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    counts = {evaluator: known_counter(evaluator) for evaluator in evaluations_map}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "levels": user_levels,
+            "counts": {evaluator: counter for evaluator, counter in counts.items() if counter},
+        }, f, ensure_ascii=False)
+
+# Export the alerts if there are any. The rule runs on `jobs` processes.
+def export_alerts_report(jobs=1, headers=None):
+    evaluators = [e for e in evaluations_map if user_levels.get(e) is not None]
+    resolve_alert_levels(evaluators, headers)
+
+    # write-only: rows are streamed to the file instead of kept as cells
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Alerts")
     ws.append([
         "Evaluator", "Evaluator Level",
         "Evaluated", "Evaluated Level",
@@ -177,61 +454,171 @@ def export_alerts_report():
     ])
 
     count = 0
-    token = get_token(uid, secret)
-    headers = {"Authorization": f"Bearer {token}"}
+    all_alerts = parallel.starmap(
+        pair_alerts, [(user_levels[e], known_counter(e)) for e in evaluators], jobs)
 
-    for evaluator, counter in evaluations_map.items():
+    for evaluator, alerts in zip(evaluators, all_alerts):
         eval_level = user_levels.get(evaluator)
-        if eval_level is None:
-            continue
-
-        threshold = 3 if eval_level <= 2 else round(eval_level - 1)
-        total_evals = sum(abs(v) for v in counter.values())
-
-        for evaluated, times in counter.items():
-            if times <= 1:
-                continue
-
-            porcentaje = times / total_evals if total_evals > 0 else 0
-            if total_evals > 11:
-                penalization = 5 if porcentaje > 0.10 else -2
-            else:
-                penalization = 0;
 
-            adjusted_times = times + penalization
+        for evaluated, times, porcentaje, adjusted_times in alerts:
+            level_corrected = user_levels[evaluated]
 
-            if adjusted_times > threshold:
-                level_corrected = user_levels.get(evaluated)
-
-                if level_corrected is None:
-                    try:
-                        _, lvl = get_user_data(evaluated, headers)
-                        user_levels[evaluated] = lvl
-                        level_corrected = lvl
-                    except:
-                        level_corrected = "N/A"
-
-                ws.append([
-                    evaluator, eval_level,
-                    evaluated, level_corrected,
-                    times, f"{porcentaje:.0%}", adjusted_times
-                ])
-                count += 1
+            ws.append([
+                evaluator, eval_level,
+                evaluated, level_corrected,
+                times, f"{porcentaje:.0%}", adjusted_times
+            ])
+            count += 1
 
     if count > 0:
         wb.save(DESTINY_FILE)
         print(f"\n{Color.RED}{count} alerts registered in doc {Color.RESET}")
     else:
+        ws.close()  # nothing to save, release the streamed sheet
         print(f"\n{Color.GREEN}No alerts. No one in the group had any suspicious behaviour{Color.RESET}")
+    save_pair_counts(headers=headers)
+
+def read_logins():
+    with open(ORIGIN_FILE, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+# Sends a new alert to the log and, when configured, to a JSONL file and a webhook
+def emit_alert(alert, alerts_file=None, webhook=None):
+    print(f"{Color.RED}[{alert['detected_at']}] ALERT: {alert['evaluator']} (Lvl {alert['evaluator_level']}) -> "
+          f"{alert['evaluated']}: {alert['times']} evaluations, {alert['percent']} of total, "
+          f"adjusted {alert['adjusted']}{Color.RESET}")
+    if alerts_file:
+        with open(alerts_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+    if webhook:
+        try:
+            api_client.post(webhook, json=alert, timeout=10)
+        except requests.exceptions.RequestException as e:
+            print(f"{Color.YELLOW}   Webhook failed: {e}{Color.RESET}")
+
+# Re-checks the pairs of the given evaluators and emits the ones not alerted yet.
+# known_alerts keeps the pairs currently over the threshold.
+def check_new_alerts(evaluators, known_alerts, alerts_file=None, webhook=None, emit=True):
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    new_alerts = 0
+    for evaluator in evaluators:
+        current = {}
+        for evaluated, times, porcentaje, adjusted_times in evaluator_alerts(evaluator):
+            current[(evaluator, evaluated)] = {
+                "detected_at": now,
+                "evaluator": evaluator, "evaluator_level": user_levels.get(evaluator),
+                "evaluated": evaluated, "evaluated_level": user_levels.get(evaluated),
+                "times": times, "percent": f"{porcentaje:.0%}", "adjusted": adjusted_times,
+            }
+        stale = {pair for pair in known_alerts if pair[0] == evaluator and pair not in current}
+        known_alerts.difference_update(stale)  # pairs that drop below can alert again later
+        for pair, alert in current.items():
+            if pair not in known_alerts:
+                known_alerts.add(pair)
+                if emit:
+                    emit_alert(alert, alerts_file, webhook)
+                new_alerts += 1
+    return new_alerts
+
+# Evaluator levels whose user index snapshot expired are fetched again, so the
+# thresholds follow level-ups on long runs. Returns the logins whose level changed.
+def refresh_levels(logins, headers):
+    changed = set()
+    for login in logins:
+        if user_index.cached_entry(login):
+            continue
+        try:
+            _, level = get_user_data(login, headers)
+        except Exception as e:
+            print(f"{Color.RED} Cannot refresh the level of '{login}': {e}{Color.RESET}")
+            continue
+        if level != user_levels.get(login):
+            user_levels[login] = level
+            changed.add(login)
+    return changed
+
+# Long running mode: counts everything once, then polls the scale_teams updated
+# since the last poll and only re-evaluates the evaluators they touch.
+def watch(logins, interval, alerts_file=None, webhook=None):
+    token = get_token(uid, secret)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_catalog.prefetch(headers)
+
+    user_ids = {}
+    for login in logins:
+        try:
+            user_id, level = get_user_data(login, headers)
+            user_ids[login] = user_id
+            user_levels[login] = level
+        except requests.exceptions.HTTPError as e:
+            print(f"{Color.RED} Error with '{login}': {e}{Color.RESET}")
+
+    last_poll = datetime.now(timezone.utc)
+    for login, user_id in user_ids.items():
+        process_evaluations(get_given_evaluations(user_id, headers), login, headers)
+
+    resolve_alert_levels(user_ids, headers)
+    known_alerts = set()
+    baseline = check_new_alerts(user_ids, known_alerts, emit=False)
+    print(f"{Color.WHITE}Watching {len(user_ids)} evaluators, {baseline} alerts already present. "
+          f"Polling every {interval}s{Color.RESET}")
+
+    while True:
+        time.sleep(interval)
+        poll_start = datetime.now(timezone.utc)
+        # a small overlap so nothing updated while paginating gets lost
+        since = (last_poll - timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        until = poll_start.strftime("%Y-%m-%dT%H:%M:%SZ")
+        try:
+            token = get_token(uid, secret)  # tokens expire, renew once per poll
+            headers = {"Authorization": f"Bearer {token}"}
+            affected = set()
+            for login in refresh_levels(user_ids, headers):
+                affected.add(login)
+                if not evaluations_map[login] and user_levels[login] is not None:
+                    # not counted while it had no level, its whole history is needed
+                    process_evaluations(get_given_evaluations(user_ids[login], headers), login, headers)
+            for login, user_id in user_ids.items():
+                evals = get_given_evaluations(user_id, headers, {"range[updated_at]": f"{since},{until}"})
+                if evals:
+                    process_evaluations(evals, login, headers)
+                    affected.add(login)
+            resolve_alert_levels(affected, headers)
+            new_alerts = check_new_alerts(affected, known_alerts, alerts_file, webhook)
+            print(f"{Color.WHITE}[{until}] {len(affected)} evaluators updated, {new_alerts} new alerts{Color.RESET}")
+            last_poll = poll_start
+        except Exception as ex:
+            print(f"{Color.RED} Poll failed, retrying next interval: {ex}{Color.RESET}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Detect suspicious evaluation patterns in a group of logins.")
+    parser.add_argument("--watch", action="store_true", help="keep running and emit new alerts as they appear")
+    parser.add_argument("--interval", type=int, default=WATCH_INTERVAL, help="seconds between polls in --watch mode")
+    parser.add_argument("--alerts-file", help="append new alerts as JSON lines to this file")
+    parser.add_argument("--webhook", help="POST every new alert as JSON to this URL")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="processes used to apply the alert rule")
+    parser.add_argument("--window-days", type=int,
+                        help="apply the rule over sliding windows of this many days instead of the whole history")
+    return parser.parse_args()
 
 # MAIN 
 def main():
+    args = parse_args()
+    if args.watch:
+        try:
+            watch(read_logins(), args.interval, args.alerts_file, args.webhook)
+        except KeyboardInterrupt:
+            print(f"\n{Color.WHITE}Watch stopped.{Color.RESET}")
+        except Exception as ex:
+            print(f"{Color.RED} General Error: {ex}{Color.RESET}")
+        return
+
     try:
         token = get_token(uid, secret)
         headers = {"Authorization": f"Bearer {token}"}
+        project_catalog.prefetch(headers)
 
-        with open(ORIGIN_FILE, "r", encoding="utf-8") as f:
-            logins = [line.strip() for line in f if line.strip()]
+        logins = read_logins()
 
         for login in logins:
             print(f"{Color.GREEN}Procesing '{login}'…{Color.RESET}")
@@ -249,7 +636,10 @@ def main():
             except requests.exceptions.HTTPError as e:
                 print(f"{Color.RED} Error with '{login}': {e}{Color.RESET}")
 
-        export_alerts_report()
+        if args.window_days:
+            export_window_report(args.window_days, headers)
+        else:
+            export_alerts_report(args.jobs, headers)
 
     except Exception as ex:
         print(f"{Color.RED} General Error: {ex}{Color.RESET}")
@@ -2,9 +2,16 @@ import requests
 from collections import defaultdict, Counter
 from openpyxl import Workbook
 import os
+import re
 import time
 import json
+import argparse
+from pathlib import Path
 from collections import defaultdict, Counter
+import api_client
+import get_evals
+import project_catalog
+import user_index
 
 API_BASE = "https://api.intra.42.fr/v2"
 TOKEN_URL = f"{API_BASE}/oauth/token"
@@ -34,9 +41,9 @@ def safe_request(method, url, headers=None, params=None, data=None, retries=5, d
     for attempt in range(retries):
         try:
             if method.lower() == 'get':
-                return requests.get(url, headers=headers, params=params, timeout=10)
+                return api_client.get(url, headers=headers, params=params, timeout=10)
             elif method.lower() == 'post':
-                return requests.post(url, headers=headers, data=data, timeout=10)
+                return api_client.post(url, headers=headers, data=data, timeout=10)
         except requests.exceptions.RequestException as e:
             print(f"{Color.YELLOW}   REattampt {attempt + 1}/{retries} because of connection error: {e}{Color.RESET}")
             time.sleep(delay)
@@ -54,6 +61,10 @@ def get_token():
 
 # User data (ID and cursus level)
 def get_user_data(username, headers):
+    entry = user_index.cached_entry(username)
+    if entry:
+        return entry["id"], entry.get("level")
+
     resp = safe_request('get', f"{API_BASE}/users/{username}", headers=headers)
     resp.raise_for_status()
     data = resp.json()
@@ -64,6 +75,7 @@ def get_user_data(username, headers):
             level = cursus.get("level")
             time.sleep(1)
             break
+    user_index.remember(username, data["id"], level)
     return data["id"], level
 
 # Get evals that a given user did to others
@@ -112,19 +124,13 @@ def process_evaluations(evals, evaluator, headers):
 
         final_mark = e.get("final_mark")
 
-        team = e.get("team", {})
-        project_name = "Unknown"
-
-        if "project" in team and isinstance(team["project"], dict):
-            project_name = team["project"].get("name", "Unknown")
-        elif "project_gitlab_path" in team:
-            # path as project name, possible solution
-            project_name = team["project_gitlab_path"].split("/")[-1]
+        project_id, project_name = project_catalog.team_project(e.get("team", {}))
+        project_name = project_name or "Unknown"
 
         cursus_id = e.get("cursus_id", "N/A")
-        
-        # new filter for cursus
-        if any(keyword in project_name for keyword in ["piscine", "rush", "exam", "shell-","c-"]):
+
+        # only the categories in project_catalog.INCLUDED count (no piscine, exam or rush)
+        if not project_catalog.included(project_id, project_name):
             continue
 
         for user in e.get("correcteds", []):
@@ -149,58 +155,76 @@ def process_evaluations(evals, evaluator, headers):
                 else:
                    print(f"{Color.YELLOW}   Without final grade {evaluated} (Proyect: '{project_name}', Cursus ID: {cursus_id}){Color.RESET}")
 
-# Export the alerts if there are any
-def export_alerts_report():
+HEADER = [
+    "Evaluator", "Evaluator Level",
+    "Evaluated", "Evaluated Level",
+    "Number of Evaluations", "% of Total", "Adjusted"
+]
+
+# Sheet names are limited to 31 characters, cannot hold \ / ? * [ ] : and must
+# be unique (Excel compares them ignoring case)
+def sheet_title(name, wb):
+    name = re.sub(r"[\\/?*\[\]:]", "_", name)
+    taken = {t.lower() for t in wb.sheetnames}
+    title = name[:31]
+    n = 2
+    while title.lower() in taken:
+        suffix = f" ({n})"
+        title = name[:31 - len(suffix)] + suffix
+        n += 1
+    return title
+
+# Export the alerts if there are any. cohorts maps a sheet name to the
+# evaluators it reports; by default every evaluator goes to one "Alerts" sheet.
+def export_alerts_report(cohorts=None):
+    if cohorts is None:
+        cohorts = {"Alerts": list(evaluations_map)}
+
     wb = Workbook()
-    ws = wb.active
-    ws.title = "Alerts"
-    ws.append([
-        "Evaluator", "Evaluator Level",
-        "Evaluated", "Evaluated Level",
-        "Number of Evaluations", "% of Total", "Adjusted"
-    ])
+    wb.remove(wb.active)
 
     count = 0
     token = get_token()
     headers = {"Authorization": f"Bearer {token}"}
 
-    for evaluator, counter in evaluations_map.items():
-        eval_level = user_levels.get(evaluator)
-        if eval_level is None:
-            continue
-
-        threshold = 3 if eval_level <= 2 else round(eval_level - 1)
-        total_evals = sum(abs(v) for v in counter.values())
+    for name, evaluators in cohorts.items():
+        ws = wb.create_sheet(sheet_title(name, wb))
+        ws.append(HEADER)
+        cohort_count = 0
 
-        for evaluated, times in counter.items():
-            if times <= 1:
+        for evaluator in evaluators:
+            counter = evaluations_map.get(evaluator)
+            eval_level = user_levels.get(evaluator)
+            if not counter or eval_level is None:
                 continue
 
-            percent = times / total_evals if total_evals > 0 else 0
-            if total_evals > 11:
-                penalization = 5 if percent > 0.10 else -2
-            else:
-                penalization = 0;
-
-            adjusted_times = times + penalization
-
-            if adjusted_times > threshold:
-                level_corrected = user_levels.get(evaluated)
-
-                if level_corrected is None:
-                    try:
-                        _, lvl = get_user_data(evaluated, headers)
-                        user_levels[evaluated] = lvl
-                        level_corrected = lvl
-                    except:
-                        level_corrected = "N/A"
-
-                ws.append([
-                    evaluator, eval_level,
-                    evaluated, level_corrected,
-                    times, f"{percent:.0%}", adjusted_times
-                ])
-                count += 1
+            total_evals = sum(abs(v) for v in counter.values())
+
+            for evaluated, times in counter.items():
+                # the rule and its constants are the ones of get_evals.py
+                alert = get_evals.pair_alert(eval_level, times, total_evals)
+                if alert:
+                    percent, adjusted_times = alert
+                    level_corrected = user_levels.get(evaluated)
+
+                    if level_corrected is None:
+                        try:
+                            _, lvl = get_user_data(evaluated, headers)
+                            user_levels[evaluated] = lvl
+                            level_corrected = lvl
+                        except:
+                            level_corrected = "N/A"
+
+                    ws.append([
+                        evaluator, eval_level,
+                        evaluated, level_corrected,
+                        times, f"{percent:.0%}", adjusted_times
+                    ])
+                    cohort_count += 1
+
+        if len(cohorts) > 1:
+            print(f"{Color.WHITE}   {name}: {cohort_count} alerts{Color.RESET}")
+        count += cohort_count
 
     if count > 0:
         wb.save(DESTINY_FILE)
@@ -208,14 +232,38 @@ def export_alerts_report():
     else:
         print(f"\n{Color.GREEN}No alerts. No one in the group had any suspicious behaviour{Color.RESET}")
 
+# Sheet name of each cohort file: its stem, or its path without extension
+# when two files share the stem (2023/march.txt and 2024/march.txt)
+def cohort_names(files):
+    files = list(dict.fromkeys(files))
+    stems = Counter(Path(f).stem for f in files)
+    return {Path(f).stem if stems[Path(f).stem] == 1 else str(Path(f).with_suffix("")): f for f in files}
+
+def read_logins(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
 # MAIN 
 def main():
+    global DESTINY_FILE
+    parser = argparse.ArgumentParser(description="Evaluation alerts for one or more cohorts of logins.")
+    parser.add_argument("cohorts", nargs="*", default=[ORIGIN_FILE],
+                        help=f"files with one login per line, one sheet each (default {ORIGIN_FILE})")
+    parser.add_argument("--out", default=DESTINY_FILE, help=f"XLSX to write (default {DESTINY_FILE})")
+    args = parser.parse_args()
+    DESTINY_FILE = args.out
+
     try:
         token = get_token()
         headers = {"Authorization": f"Bearer {token}"}
+        project_catalog.prefetch(headers)
 
-        with open(ORIGIN_FILE, "r", encoding="utf-8") as f:
-            logins = [line.strip() for line in f if line.strip()]
+        cohorts = {name: read_logins(f) for name, f in cohort_names(args.cohorts).items()}
+        # every login is fetched once even when it belongs to several cohorts
+        logins = list(dict.fromkeys(login for members in cohorts.values() for login in members))
+        if len(cohorts) > 1:
+            total = sum(len(members) for members in cohorts.values())
+            print(f"{Color.WHITE}{len(cohorts)} cohorts, {total} logins, {len(logins)} unique{Color.RESET}")
 
         for login in logins:
             print(f"{Color.GREEN}Procesing '{login}'…{Color.RESET}")
@@ -233,10 +281,10 @@ def main():
             except requests.exceptions.HTTPError as e:
                 print(f"{Color.RED} Error with '{login}': {e}{Color.RESET}")
 
-        export_alerts_report()
+        export_alerts_report(cohorts if len(cohorts) > 1 else None)
 
     except Exception as ex:
         print(f"{Color.RED} General Error: {ex}{Color.RESET}")
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -5,6 +5,8 @@ import os
 import time
 import json
 import re
+import api_client
+import user_index
 
 API_BASE = "https://api.intra.42.fr/v2"
 TOKEN_URL = f"{API_BASE}/oauth/token"
@@ -33,9 +35,9 @@ def safe_request(method, url, headers=None, params=None, data=None, retries=5, d
     for attempt in range(retries):
         try:
             if method.lower() == 'get':
-                return requests.get(url, headers=headers, params=params, timeout=10)
+                return api_client.get(url, headers=headers, params=params, timeout=10)
             elif method.lower() == 'post':
-                return requests.post(url, headers=headers, data=data, timeout=10)
+                return api_client.post(url, headers=headers, data=data, timeout=10)
         except requests.exceptions.RequestException as e:
             print(f"{Color.YELLOW} Reattempt {attempt + 1}/{retries} because of connection error: {e}{Color.RESET}")
             time.sleep(delay)
@@ -49,6 +51,10 @@ def get_token():
 
 # User data (ID and cursus level)
 def get_user_data(username, headers):
+    entry = user_index.cached_entry(username)
+    if entry:
+        return entry["id"], entry.get("level")
+
     resp = safe_request('get', f"{API_BASE}/users/{username}", headers=headers)
     resp.raise_for_status()
     data = resp.json()
@@ -58,6 +64,7 @@ def get_user_data(username, headers):
             level = cursus.get("level")
             time.sleep(1)
             break
+    user_index.remember(username, data["id"], level)
     return data["id"], level
 
 # Get evals that a given user did to others
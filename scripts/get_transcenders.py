@@ -2,9 +2,12 @@
 import os
 import time
 import json
+import argparse
 import requests
 from pathlib import Path
 from dotenv import load_dotenv
+import api_client
+import user_index
 
 load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
 
@@ -14,14 +17,18 @@ UID = os.getenv("UID")
 SECRET = os.getenv("SECRET")
 
 INPUT_FILES = ["users/all_campus_users.txt"]
+DELTA_FILES = ["users/changed_campus_users.txt"]  # written by get_campus_users.py
 OUTPUT_FILE = "users_transcender_and_alumni.txt"
 
 REQUEST_DELAY = 0.5  # delay between requests to avoid rate limiting
+CAMPUS_ID = int(os.getenv("CAMPUS_ID", "37"))  # Malaga campus by default
+CURSUS_ID = 21  # 42cursus
+TRANSCENDER_GRADE = "Transcender"
 
 def get_token(uid, secret):
     if not uid or not secret:
         raise RuntimeError("UID y SECRET should be on .env")
-    res = requests.post(f"{BASE_URL}/oauth/token", data={
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
         "grant_type": "client_credentials",
         "client_id": uid,
         "client_secret": secret
@@ -29,12 +36,13 @@ def get_token(uid, secret):
     res.raise_for_status()
     return res.json()["access_token"]
 
-def read_logins():
-    for fname in INPUT_FILES:
+def read_logins(files=INPUT_FILES):
+    for fname in files:
         p = Path(fname)
         if p.exists():
             with p.open("r", encoding="utf-8") as f:
-                return [l.strip() for l in f if l.strip()]
+                # all_campus_users.txt stores "login<TAB>grade", keep the login
+                return [l.split("\t")[0].strip() for l in f if l.strip()]
     return []
 
 # Receives the parsed JSON of the user and returns (is_transcender, is_alumni).
@@ -71,17 +79,95 @@ def detect_transcender_and_alumni(data):
 def user_check(login, token):
     url = f"{API_BASE}/users/{login}"
     headers = {"Authorization": f"Bearer {token}"}
-    res = requests.get(url, headers=headers, timeout=15)
+    res = api_client.get(url, headers=headers, timeout=15)
     if res.status_code == 404:
         return False, False
     res.raise_for_status()
     data = res.json()
     return detect_transcender_and_alumni(data)
 
+# Logins holding the Transcender grade in 42cursus, filtered by the API
+def fetch_transcenders(token, campus_id):
+    cursus_users = user_index.get_all_paginated(f"{API_BASE}/cursus/{CURSUS_ID}/cursus_users", token, {
+        "filter[campus_id]": campus_id,
+        "filter[grade]": TRANSCENDER_GRADE,
+    })
+    return {cu["user"]["login"] for cu in cursus_users if cu.get("user")}
+
+# Alumni logins of the campus, filtered by the API
+def fetch_alumni(token, campus_id):
+    users = user_index.get_all_paginated(f"{API_BASE}/campus/{campus_id}/users", token, {
+        "filter[alumni?]": "true",
+    })
+    return {u["login"] for u in users if u.get("login")}
+
+# Answers from two paginated listings instead of one profile request per login.
+# When a login file exists only those logins are reported.
+def bulk_check(token, campus_id, logins=None):
+    transcenders = fetch_transcenders(token, campus_id)
+    alumni = fetch_alumni(token, campus_id)
+    found = transcenders | alumni
+    if logins:
+        found &= set(logins)
+
+    results = []
+    for login in sorted(found):
+        labels = []
+        if login in transcenders:
+            labels.append("Transcender")
+        if login in alumni:
+            labels.append("Alumni")
+        results.append((login, ",".join(labels)))
+    return results
+
+# With checked_logins (delta runs) only the lines of those logins are replaced
+def save_results(results, checked_logins=None):
+    if checked_logins is not None:
+        previous = []
+        if Path(OUTPUT_FILE).exists():
+            with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
+                previous = [tuple(l.rstrip("\n").split("\t", 1)) for l in f if l.strip()]
+        checked = set(checked_logins)
+        results = [r for r in previous if r[0] not in checked] + results
+    if results:
+        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+            for login, labels in results:
+                f.write(f"{login}\t{labels}\n")
+    print(f"\Done. {len(results)} Outer Core users registered in {OUTPUT_FILE}.")
+
 def main():
-    logins = read_logins()
+    arg_parser = argparse.ArgumentParser(description="Detect Transcender and Alumni users.")
+    arg_parser.add_argument("--bulk", action="store_true",
+                            help="use filtered campus listings instead of one request per login")
+    arg_parser.add_argument("--campus", type=int, default=CAMPUS_ID, help="campus id for --bulk")
+    arg_parser.add_argument("--delta", action="store_true",
+                            help="only check the logins that changed in the last get_campus_users.py run")
+    args = arg_parser.parse_args()
+
+    input_files = DELTA_FILES if args.delta else INPUT_FILES
+    logins = read_logins(input_files)
+    checked_logins = logins if args.delta else None
+    if args.delta and not logins:
+        print("No changed logins since the last snapshot (busqué: {})".format(", ".join(input_files)))
+        return
+    if args.bulk:
+        try:
+            token = get_token(UID, SECRET)
+            results = bulk_check(token, args.campus, logins)
+        except requests.HTTPError as he:
+            code = he.response.status_code if he.response is not None else "?"
+            print(f"[ERROR] HTTP {code}: {he}")
+            return
+        except Exception as e:
+            print(f"[ERROR] {e}")
+            return
+        for login, labels in results:
+            print(f"{login} FOUND : {labels}")
+        save_results(results, checked_logins)
+        return
+
     if not logins:
-        print("No files present or no logins found (busqué: {})".format(", ".join(INPUT_FILES)))
+        print("No files present or no logins found (busqué: {})".format(", ".join(input_files)))
         return
     try:
         token = get_token(UID, SECRET)
@@ -112,11 +198,7 @@ def main():
             print(f"ERR: {ex}")
         time.sleep(REQUEST_DELAY)
 
-    if results:
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            for login, labels in results:
-                f.write(f"{login}\t{labels}\n")
-    print(f"\Done. {len(results)} Outer Core users registered in {OUTPUT_FILE}.")
+    save_results(results, checked_logins)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
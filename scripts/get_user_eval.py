@@ -2,8 +2,10 @@ import requests
 import os
 import time
 import sys
-import numpy as np
 from collections import defaultdict, Counter
+import api_client
+import get_evals
+import user_index
 
 API_BASE = "https://api.intra.42.fr/v2"
 TOKEN_URL = f"{API_BASE}/oauth/token"
@@ -31,15 +33,15 @@ def safe_request(method, url, headers=None, params=None, data=None, retries=5, d
         try:
             response = None
             if method.lower() == 'get':
-                response = requests.get(url, headers=headers, params=params, timeout=15)
+                response = api_client.get(url, headers=headers, params=params, timeout=15)
             elif method.lower() == 'post':
-                response = requests.post(url, headers=headers, data=data, timeout=15)
+                response = api_client.post(url, headers=headers, data=data, timeout=15)
             else:
                 raise ValueError("Unsupported HTTP method")
 
             # Handling of rate limiting
             if response.status_code == 429:
-                retry_after = int(response.headers.get("Retry-After", delay))
+                retry_after = api_client.retry_after(response, attempt)
                 print(f"{Color.YELLOW}   Rate limit hit. Waiting {retry_after} seconds...{Color.RESET}")
                 time.sleep(retry_after)
                 continue  # Retry the request
@@ -66,6 +68,10 @@ def get_token():
 
 # User data (ID and cursus level)
 def get_user_data(username, headers):
+    entry = user_index.cached_entry(username)
+    if entry:
+        return entry["id"], entry.get("level")
+
     resp = safe_request('get', f"{API_BASE}/users/{username}", headers=headers)
     data = resp.json()
 
@@ -74,6 +80,8 @@ def get_user_data(username, headers):
         if cursus.get("cursus_id") == 21:  # Cursus 42
             level = cursus.get("level")
             break
+    if data.get("id"):
+        user_index.remember(username, data["id"], level)
     return data.get("id"), level
 
 
@@ -139,9 +147,33 @@ def process_received_evaluations(evals, evaluated, headers):
             except requests.exceptions.HTTPError:
                 user_levels[evaluator_login] = None
 
-        if final_mark is not None:
-            delta = 1 if final_mark >= 100 else -1
-            evaluations_map[evaluated][evaluator_login] += delta
+    evaluations_map[evaluated].update(count_received(evals, evaluated))
+
+
+# {evaluator: +1 per passed / -1 per failed evaluation} received by `evaluated`, without module state
+def count_received(evals, evaluated):
+    counter = Counter()
+    for e in evals:
+        final_mark = e.get("final_mark")
+        evaluator_login = e.get("corrector", {}).get("login")
+        if not evaluator_login or evaluator_login == evaluated or final_mark is None:
+            continue
+        counter[evaluator_login] += 1 if final_mark >= 100 else -1
+    return counter
+
+
+# Alert rule over the evaluations one user received, the rule of get_evals.py
+# with the evaluated user's level. Returns (threshold, [(evaluator, times, adjusted)])
+# for the evaluators over it.
+def received_alerts(eval_level, counter):
+    total_evals = sum(abs(v) for v in counter.values())
+
+    alerts = []
+    for evaluator, times in counter.items():
+        alert = get_evals.pair_alert(eval_level, times, total_evals)
+        if alert:
+            alerts.append((evaluator, times, alert[1]))
+    return get_evals.alert_threshold(eval_level), alerts
 
 
 def check_alerts(login):
@@ -151,34 +183,19 @@ def check_alerts(login):
         if eval_level is None:
             continue
 
-        threshold = 3 if eval_level <= 2 else round(eval_level - 1)
-        total_evals = sum(abs(v) for v in counter.values())
-        
-        if total_evals == 0:
-            continue
-
-        # Formula for alert detection
-        evaluators = list(counter.keys())
-        values = np.array(list(counter.values()))
-        percentages = values / total_evals if total_evals > 0 else np.zeros_like(values)
-        
-        penalties = np.where(total_evals > 11, np.where(percentages > 0.10, 5, -2), 0)
-        adjusted_values = values + penalties
-
-        mask = adjusted_values > threshold
-        if np.any(mask):
+        threshold, alerts = received_alerts(eval_level, counter)
+        if alerts:
             alerts_found = True
             print(f"\n{Color.CYAN}--- Alerts for {evaluated} (Lvl {eval_level:.2f}) ---{Color.RESET}")
-            
-            for i in np.where(mask)[0]:
-                evaluator = evaluators[i]
+
+            for evaluator, times, adjusted in alerts:
                 evaluator_lvl = user_levels.get(evaluator)
                 lvl_str = f"{evaluator_lvl:.2f}" if evaluator_lvl is not None else "N/A"
-                
+
                 print(f"{Color.RED} ALERT: {evaluator} (Lvl {lvl_str}) "
-                      f"gave {values[i]} valids. "
-                      f"Adjusted score: {adjusted_values[i]:.2f} (Threshold: {threshold}){Color.RESET}")
-                
+                      f"gave {times} valids. "
+                      f"Adjusted score: {adjusted:.2f} (Threshold: {threshold}){Color.RESET}")
+
     if not alerts_found:
         print(f"\n{Color.GREEN}No significant evaluation patterns detected for {login}.{Color.RESET}")
 
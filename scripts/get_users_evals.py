@@ -1,6 +1,8 @@
-import requests
+import os
 import csv
 import time
+import api_client
+import user_index
 
 ACCESS_TOKEN = ""
 
@@ -9,9 +11,13 @@ HEADERS = {
 }
 
 def get_user_id(login):
+    user_id = user_index.user_id(login)
+    if user_id:
+        return user_id
     url = f"https://api.intra.42.fr/v2/users/{login}"
-    res = requests.get(url, headers=HEADERS)
+    res = api_client.get(url, headers=HEADERS)
     if res.status_code == 200:
+        user_index.remember(login, res.json()['id'], with_level=False)
         return res.json()['id']
     else:
         print(f"[ERROR] Error cannot obtain ID for {login} ({res.status_code})")
@@ -22,7 +28,7 @@ def get_user_corrections(user_id):
     page = 1
     while True:
         url = f"https://api.intra.42.fr/v2/users/{user_id}/scale_teams/as_corrector?page={page}&per_page=100"
-        res = requests.get(url, headers=HEADERS)
+        res = api_client.get(url, headers=HEADERS)
         if res.status_code != 200:
             print(f"[ERROR] Failure getting evaluations for {user_id} (page {page})")
             break
@@ -57,28 +63,36 @@ def main():
     with open("logins.txt", "r") as f:
         logins = [line.strip() for line in f if line.strip()]
 
-    all_corrections = []
-
-    for login in logins:
-        print(f"Processing: {login}")
-        user_id = get_user_id(login)
-        if user_id is None:
-            continue
-        time.sleep(3)
-        raw_corrections = get_user_corrections(user_id)
-        for c in raw_corrections:
-            processed = process_correction(c)
-            all_corrections.append(processed)
-
-        time.sleep(3)
-
     keys = ["evaluator_login", "evaluated", "proyect", "final_mark", "comment", "created_at"]
-    with open("evaluaciones.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        writer.writerows(all_corrections)
-
-    print(f"Saved {len(all_corrections)} evaluations in evaluations.csv")
+    saved = 0
+
+    # rows are written as each login is processed, never all held in memory,
+    # to a temporary file that only replaces evaluaciones.csv when complete
+    tmp = "evaluaciones.csv.tmp"
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=keys)
+            writer.writeheader()
+
+            for login in logins:
+                print(f"Processing: {login}")
+                user_id = get_user_id(login)
+                if user_id is None:
+                    continue
+                time.sleep(3)
+                raw_corrections = get_user_corrections(user_id)
+                for c in raw_corrections:
+                    writer.writerow(process_correction(c))
+                    saved += 1
+                f.flush()
+
+                time.sleep(3)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, "evaluaciones.csv")
+
+    print(f"Saved {saved} evaluations in evaluations.csv")
 
 if __name__ == "__main__":
     main()
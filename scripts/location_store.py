@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+location_store.py
+
+Columnar, memory-mapped storage for location (logtime) histories.
+
+Sessions are kept as four int64 .npy columns sorted by user and begin time:
+user_id, host_id, begin and end (epoch seconds, -1 while the session is
+still open). Host names and logins live in small JSON side tables. The
+columns are opened with mmap, so aggregates run straight over the mapped
+arrays without building one dict per session.
+
+Uso:
+  python location_store.py build [--logins users/users.txt] [--store DIR]
+  python location_store.py hours [--store DIR]
+  python location_store.py series <login> [--bucket day|week] [--store DIR]
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+import logged_hours
+
+STORE_DIR = os.getenv("LOCATION_STORE", str(Path(__file__).parent / "../results/locations_store"))
+COLUMNS = ("user_id", "host_id", "begin", "end")
+BUCKETS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+
+
+def to_epoch(value):
+    if not value:
+        return -1
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+# Writes the sessions of {login: [location, ...]} as a new store in `path`
+def build(locations_by_login, path=STORE_DIR):
+    hosts = {}
+    logins = {}
+    rows = []
+    for login, locations in locations_by_login.items():
+        for loc in locations:
+            user_id = (loc.get("user") or {}).get("id")
+            if user_id is None or not loc.get("begin_at"):
+                continue
+            try:
+                begin = to_epoch(loc["begin_at"])
+                end = to_epoch(loc.get("end_at"))
+            except ValueError:
+                continue  # skip malformed dates
+            logins[user_id] = login
+            host_id = hosts.setdefault(loc.get("host") or "", len(hosts))
+            rows.append((user_id, host_id, begin, end))
+
+    table = np.array(rows, dtype=np.int64).reshape(-1, 4)
+    table = table[np.lexsort((table[:, 2], table[:, 0]))]  # by user, then begin
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for i, name in enumerate(COLUMNS):
+        np.save(path / f"{name}.npy", np.ascontiguousarray(table[:, i]))
+    with (path / "meta.json").open("w", encoding="utf-8") as f:
+        json.dump({
+            "hosts": sorted(hosts, key=hosts.get),
+            "logins": {str(k): v for k, v in logins.items()},
+        }, f, ensure_ascii=False)
+    return len(table)
+
+
+# Maps the columns read-only; nothing is loaded until it is used
+def open_store(path=STORE_DIR):
+    path = Path(path)
+    store = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+    with (path / "meta.json").open("r", encoding="utf-8") as f:
+        meta = json.load(f)
+    store["hosts"] = meta["hosts"]
+    store["logins"] = {int(k): v for k, v in meta["logins"].items()}
+    return store
+
+
+# Seconds of every closed session in `rows`, 0 for the open ones (like calc_hours)
+def durations(store, rows=slice(None)):
+    begin, end = store["begin"][rows], store["end"][rows]
+    return np.where(end >= begin, end - begin, 0)
+
+
+# {user_id: hours} over the whole store, rounded like calc_hours
+def hours_by_user(store):
+    user_id = store["user_id"]
+    if len(user_id) == 0:
+        return {}
+    # rows are sorted by user, so each user is one contiguous run
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(user_id)) + 1))
+    totals = np.add.reduceat(durations(store), starts)
+    return {int(u): round(int(t) / 3600, 2) for u, t in zip(user_id[starts], totals)}
+
+
+# Rows of one user, found by binary search on the sorted user column
+def user_slice(store, user_id):
+    column = store["user_id"]
+    return slice(np.searchsorted(column, user_id, "left"), np.searchsorted(column, user_id, "right"))
+
+
+# Hours per time bucket as (bucket start epochs, hours). A session counts
+# in the bucket where it begins.
+def bucketed_hours(store, bucket_seconds=BUCKETS["day"], user_id=None):
+    rows = user_slice(store, user_id) if user_id is not None else slice(None)
+    begin = np.asarray(store["begin"][rows])
+    seconds = durations(store, rows)
+    if len(begin) == 0:
+        return np.array([], dtype=np.int64), np.array([])
+    bucket = begin // bucket_seconds
+    first = bucket.min()
+    totals = np.bincount(bucket - first, weights=seconds)
+    starts = (np.arange(len(totals)) + first) * bucket_seconds
+    return starts, totals / 3600
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar store for location histories.")
+    parser.add_argument("command", choices=["build", "hours", "series"])
+    parser.add_argument("login", nargs="?", help="login for the series command")
+    parser.add_argument("--store", default=STORE_DIR, help=f"store directory (default {STORE_DIR})")
+    parser.add_argument("--logins", default="users/users.txt", help="logins to fetch for build")
+    parser.add_argument("--bucket", choices=BUCKETS, default="day", help="series bucket size")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        logins = logged_hours.leer_logins(args.logins)
+        if not logins:
+            print(f"No {args.logins} found or file is empty.")
+            return
+        try:
+            token = logged_hours.get_token(logged_hours.UID, logged_hours.SECRET)
+        except Exception as e:
+            print(f"Error getting token: {e}")
+            return
+        locations = {}
+        for login in logins:
+            print(f"Processing '{login}'…")
+            locations[login] = logged_hours.get_locations(token, login)
+        count = build(locations, args.store)
+        print(f"Stored {count} sessions of {len(logins)} users in {args.store}")
+        return
+
+    try:
+        store = open_store(args.store)
+    except FileNotFoundError:
+        print(f"No store in {args.store}, run the build command first.")
+        sys.exit(1)
+
+    if args.command == "hours":
+        results = [(store["logins"].get(u, str(u)), h) for u, h in hours_by_user(store).items()]
+        print("RANKING")
+        for i, (login, hours) in enumerate(sorted(results, key=lambda x: x[1], reverse=True), 1):
+            print(f"{i:2d}. {login}: {hours:.2f} hours")
+        return
+
+    user_ids = [u for u, login in store["logins"].items() if login == args.login]
+    if not user_ids:
+        print(f"{args.login} is not in the store.")
+        sys.exit(1)
+    starts, hours = bucketed_hours(store, BUCKETS[args.bucket], user_ids[0])
+    for start, value in zip(starts, hours):
+        if value:
+            day = datetime.fromtimestamp(int(start), timezone.utc).strftime("%Y-%m-%d %H:%M")
+            print(f"{day}  {value:7.2f} h")
+
+
+if __name__ == "__main__":
+    main()
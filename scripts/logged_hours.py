@@ -1,10 +1,12 @@
-import requests
 import time
 from dateutil import parser
 import os
 import sys
+import argparse
 from dotenv import load_dotenv
 from pathlib import Path
+import api_client
+import parallel
 
 load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
 
@@ -26,7 +28,7 @@ def get_token(uid, secret):
     print("get_token -> UID:", uid)
     print("get_token -> SECRET mask:", (secret[:4] + "..." + secret[-4:]) if secret else None)
 
-    res = requests.post(f"{BASE_URL}/oauth/token", data={
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
         "grant_type": "client_credentials",
         "client_id": uid,
         "client_secret": secret,
@@ -48,7 +50,7 @@ def get_locations(token, login):
     all_locations = []
     while url:
         time.sleep(0.5)
-        res = requests.get(url, headers=headers, timeout=15)
+        res = api_client.get(url, headers=headers, timeout=15)
         if res.status_code != 200:
             print(f"{login} - Error {res.status_code}")
             break
@@ -74,6 +76,11 @@ def calc_hours(locations):
 
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Logged hours ranking of the logins in users/users.txt.")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=1,
+                            help=f"processes used to compute the hours (this machine has {parallel.default_jobs()})")
+    args = arg_parser.parse_args()
+
     # Print only, do not write files
     logins = leer_logins()
     if not logins:
@@ -92,12 +99,14 @@ def main():
         print(f"Error getting token: {e}")
         return
 
-    results = []
+    all_locations = []
     for login in logins:
         print(f"Processing '{login}'…")
-        locations = get_locations(token, login)
-        hours = calc_hours(locations)
-        results.append((login, hours))
+        all_locations.append(get_locations(token, login))
+
+    hours_by_login = parallel.map_users(calc_hours, all_locations, args.jobs)
+    results = list(zip(logins, hours_by_login))
+    for login, hours in results:
         print(f"  → {login}: {hours:.2f} hours")
 
     sorted_results = sorted(results, key=lambda x: x[1], reverse=True)
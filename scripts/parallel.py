@@ -0,0 +1,35 @@
+"""
+parallel.py
+
+Runs CPU-bound per-user computations on a process pool. Results always come
+back in the order of the input, so the merged output does not depend on
+how the work was split or which process finished first.
+
+The function must be defined at module level (it is pickled to the
+workers) and receive everything it needs as arguments.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+
+# Calls func(*args) for every tuple of args_list with up to `jobs` processes.
+# jobs <= 1 runs in the current process without a pool.
+def starmap(func, args_list, jobs=1):
+    args_list = list(args_list)
+    if jobs <= 1 or len(args_list) < 2:
+        return [func(*args) for args in args_list]
+
+    jobs = min(jobs, len(args_list))
+    # a few chunks per worker keeps them busy when users have very different sizes
+    chunksize = max(1, len(args_list) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(func, *zip(*args_list), chunksize=chunksize))
+
+
+def map_users(func, items, jobs=1):
+    return starmap(func, ((item,) for item in items), jobs)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+project_catalog.py
+
+Project id -> category (piscine, exam, rush, common_core, outer_core) built
+once from the project catalog of the cursus and kept in
+results/project_catalog.json. The evaluation scripts look the project id of
+each scale_team up here instead of scanning its name for keywords.
+
+Projects missing from the catalog are classified by slug/name the first
+time they are seen and remembered for the rest of the run.
+
+Uso:
+  python project_catalog.py                 download the catalog (cursus 21 and the C piscine)
+  python project_catalog.py --show 1331     category of a project id
+
+Environment:
+  PROJECT_CATEGORIES=common_core,outer_core   categories the alert scripts count (default)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+import api_client
+
+load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
+
+API_BASE = "https://api.intra.42.fr/v2"
+BASE_URL = "https://api.intra.42.fr"
+UID = os.getenv("UID")
+SECRET = os.getenv("SECRET")
+
+CATALOG_FILE = Path(os.getenv("PROJECT_CATALOG_FILE", Path(__file__).parent / "../results/project_catalog.json"))
+CURSUS_IDS = (21, 9)  # 42cursus and C Piscine
+MAX_AGE = 7 * 24 * 3600  # the catalog rarely changes
+CATEGORIES = ("piscine", "exam", "rush", "common_core", "outer_core")
+
+
+# Categories of a comma separated list, "common_core, piscine" included
+def parse_categories(text):
+    return {c.strip() for c in text.split(",") if c.strip()}
+
+
+INCLUDED = parse_categories(os.getenv("PROJECT_CATEGORIES", "common_core,outer_core"))
+
+COMMON_CORE = {
+    "libft", "get_next_line", "ft_printf", "born2beroot", "so_long", "fdf", "fract-ol",
+    "minitalk", "pipex", "push_swap", "philosophers", "minishell", "cub3d", "minirt",
+    "netpractice", "inception", "webserv", "ft_irc", "ft_transcendence",
+}
+
+_categories = None  # project id -> category
+
+
+def get_token(uid, secret):
+    if not uid or not secret:
+        raise RuntimeError("UID y SECRET should be on .env")
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
+        "grant_type": "client_credentials",
+        "client_id": uid,
+        "client_secret": secret
+    }, timeout=10)
+    res.raise_for_status()
+    return res.json()["access_token"]
+
+
+# Category of a project from its slug, name and exam flag
+def classify(slug, name="", exam=False):
+    key = (slug or name or "").lower().replace(" ", "_")
+    if key.startswith("42cursus-"):
+        key = key[len("42cursus-"):]
+    words = set(key.replace("_", "-").split("-"))
+    if "piscine" in words or "piscine" in (name or "").lower():
+        return "piscine"
+    if exam or "exam" in words:
+        return "exam"
+    if "rush" in words or key.startswith("rush"):
+        return "rush"
+    if key in COMMON_CORE or key.startswith("cpp-module"):
+        return "common_core"
+    return "outer_core"
+
+
+def _load():
+    global _categories
+    if _categories is None:
+        try:
+            with CATALOG_FILE.open("r", encoding="utf-8") as f:
+                _categories = {int(k): v["category"] for k, v in json.load(f)["projects"].items()}
+        except (OSError, ValueError, KeyError):
+            _categories = {}
+    return _categories
+
+
+# Downloads every project of the cursus, one paginated listing each
+def fetch_catalog(headers, cursus_ids=CURSUS_IDS):
+    projects = {}
+    for cursus_id in cursus_ids:
+        page = 1
+        while True:
+            res = api_client.get(f"{API_BASE}/cursus/{cursus_id}/projects", headers=headers,
+                                 params={"page[size]": 100, "page[number]": page})
+            res.raise_for_status()
+            data = res.json()
+            if not data:
+                break
+            for project in data:
+                projects[project["id"]] = {
+                    "name": project.get("name"),
+                    "slug": project.get("slug"),
+                    "category": classify(project.get("slug"), project.get("name"), project.get("exam", False)),
+                }
+            page += 1
+            time.sleep(0.5)
+    return projects
+
+
+def save(projects):
+    CATALOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with CATALOG_FILE.open("w", encoding="utf-8") as f:
+        json.dump({"updated_at": time.time(), "projects": {str(k): v for k, v in sorted(projects.items())}},
+                  f, ensure_ascii=False, indent=1)
+
+
+# Loads the stored catalog, downloading it first when it is missing or old.
+# A failed download keeps whatever is stored; lookups then fall back to names.
+def prefetch(headers, max_age=MAX_AGE):
+    global _categories
+    try:
+        fresh = time.time() - CATALOG_FILE.stat().st_mtime < max_age
+    except OSError:
+        fresh = False
+    if not fresh:
+        try:
+            projects = fetch_catalog(headers)
+        except Exception as e:
+            print(f"[project_catalog] cannot download the catalog: {e}", file=sys.stderr)
+        else:
+            save(projects)
+            _categories = None
+    return _load()
+
+
+# O(1) category of a scale_team project; unknown ids are classified by name once
+def category(project_id, name=""):
+    categories = _load()
+    found = categories.get(project_id)
+    if found is None:
+        found = classify(name.split("/")[-1], name)
+        if project_id is not None:
+            categories[project_id] = found
+    return found
+
+
+def included(project_id, name=""):
+    return category(project_id, name) in INCLUDED
+
+
+# Project id and name of the team of a scale_team
+def team_project(team):
+    project = team.get("project") if isinstance(team.get("project"), dict) else {}
+    project_id = team.get("project_id", project.get("id"))
+    name = project.get("name") or team.get("project_gitlab_path", "").split("/")[-1]
+    return project_id, name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download and query the project catalog.")
+    parser.add_argument("--show", type=int, metavar="PROJECT_ID", help="print the category of a project id")
+    args = parser.parse_args()
+
+    if args.show is not None:
+        print(f"{args.show}: {_load().get(args.show, 'not in the catalog')}")
+        return
+
+    try:
+        token = get_token(UID, SECRET)
+    except Exception as e:
+        print(f"[ERROR] Cannot obtain token: {e}")
+        sys.exit(2)
+    projects = fetch_catalog({"Authorization": f"Bearer {token}"})
+    save(projects)
+    counts = {c: sum(1 for p in projects.values() if p["category"] == c) for c in CATEGORIES}
+    print(f"{len(projects)} projects saved in {CATALOG_FILE}: " + ", ".join(f"{n} {c}" for c, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+rate_budget.py
+
+Requests per second and per hour of the 42 API app, shared by threads of one
+process. api_gateway.py serves every local script through one budget, and
+get_campus_users.py --campuses shares one between its campus workers.
+Importing it has no side effects: nothing is installed until a caller hands
+RateBudget.acquire to api_client.throttle.
+"""
+
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+
+RATE = float(os.getenv("GATEWAY_RATE", "2"))  # requests per second of the app
+HOURLY = int(os.getenv("GATEWAY_HOURLY", "1200"))  # requests per hour of the app
+LANES = {"interactive": 0, "bulk": 1}  # lower is served first
+
+
+# Requests per second and per hour shared by every client. Waiting requests
+# are served by lane, then in arrival order.
+class RateBudget:
+    def __init__(self, rate=RATE, hourly=HOURLY):
+        self.interval = 1 / rate
+        self.hourly = hourly
+        self.next_free = 0.0
+        self.last_hour = deque()
+        self.waiting = []
+        self.served = {lane: 0 for lane in LANES}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, lane="bulk"):
+        ticket = (LANES.get(lane, LANES["bulk"]), next(self._seq))
+        with self._cond:
+            heapq.heappush(self.waiting, ticket)
+            while True:
+                if self.waiting[0] is ticket:
+                    delay = self._delay(time.monotonic())
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+            heapq.heappop(self.waiting)
+            now = time.monotonic()
+            self.next_free = max(now, self.next_free) + self.interval
+            self.last_hour.append(now)
+            self.served[lane if lane in LANES else "bulk"] += 1
+            self._cond.notify_all()
+
+    # Seconds until the next request fits in both budgets
+    def _delay(self, now):
+        while self.last_hour and self.last_hour[0] <= now - 3600:
+            self.last_hour.popleft()
+        delay = self.next_free - now
+        if len(self.last_hour) >= self.hourly:
+            delay = max(delay, self.last_hour[0] + 3600 - now)
+        return delay
+
+    def queued(self):
+        with self._cond:
+            counts = {lane: 0 for lane in LANES}
+            names = {v: k for k, v in LANES.items()}
+            for priority, _ in self.waiting:
+                counts[names[priority]] += 1
+            return counts
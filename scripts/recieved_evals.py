@@ -4,6 +4,8 @@ import os
 import sys
 from dotenv import load_dotenv
 from pathlib import Path
+import api_client
+import user_index
 
 load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
 
@@ -18,7 +20,7 @@ def get_token(uid, secret):
     print("get_token -> UID:", uid)
     print("get_token -> SECRET mask:", (secret[:4] + "..." + secret[-4:]) if secret else None)
 
-    res = requests.post(f"{BASE_URL}/oauth/token", data={
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
         "grant_type": "client_credentials",
         "client_id": uid,
         "client_secret": secret,
@@ -33,20 +35,21 @@ def get_token(uid, secret):
     res.raise_for_status()
     return res.json()["access_token"]
 
-ACCESS_TOKEN = get_token(UID, SECRET)
-
 USERNAME = "mfuente-"
 
-HEADERS = {
-    "Authorization": f"Bearer {ACCESS_TOKEN}"
-}
+HEADERS = {}  # Authorization is set in main, so the functions can be imported without a token
 
 
 def get_user_id(login):
+    user_id = user_index.user_id(login)
+    if user_id:
+        return user_id
     print(f"Obtaining user id of '{login}'…")
-    res = requests.get(f"{API_BASE}/users/{login}", headers=HEADERS)
+    res = api_client.get(f"{API_BASE}/users/{login}", headers=HEADERS)
     res.raise_for_status()
-    return res.json()["id"]
+    user_id = res.json()["id"]
+    user_index.remember(login, user_id, with_level=False)
+    return user_id
 
 
 def get_all_evaluations(user_id):
@@ -55,7 +58,7 @@ def get_all_evaluations(user_id):
     page = 1
 
     while True:
-        res = requests.get(
+        res = api_client.get(
             f"{API_BASE}/scale_teams",
             headers=HEADERS,
             params={
@@ -99,6 +102,7 @@ def save_to_csv(evaluations, filename="../results/received_evaluations.csv"):
 
 def main():
     try:
+        HEADERS["Authorization"] = f"Bearer {get_token(UID, SECRET)}"
         user_id = get_user_id(USERNAME)
         all_evals = get_all_evaluations(user_id)
         received = filter_received(all_evals, user_id)
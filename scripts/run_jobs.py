@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+run_jobs.py
+
+Runs several analyses over one cohort with a single data pass: the endpoints
+needed by all the selected analyses are planned first, every resource is
+downloaded once per login, and the same data is handed to each analysis.
+
+Uso:
+  python run_jobs.py --cohort users/users.txt --analyses given_alerts,received_alerts,hours
+
+Analyses:
+  given_alerts     alerts over the evaluations each login gave (get_evals.py)
+  received_alerts  alerts over the evaluations each login received (get_user_eval.py)
+  received_csv     received evaluations CSV per login (recieved_evals.py)
+  corrections      corrections dump to evaluaciones.csv (get_users_evals.py)
+  hours            logged hours ranking (logged_hours.py)
+"""
+
+import os
+import csv
+import sys
+import argparse
+import requests
+
+import parallel
+import project_catalog
+import get_evals
+import get_user_eval
+import get_users_evals
+import logged_hours
+import recieved_evals
+
+RESULTS_DIR = "results"
+CORRECTIONS_FILE = "evaluaciones.csv"
+
+
+# Each analysis receives the resources of one login in add() and writes its output in finish().
+# Analyses with cpu_bound = True get --jobs and run their CPU-bound step on that many processes.
+class GivenAlerts:
+    needs = {"profile", "scale_teams"}
+    cpu_bound = True
+
+    def __init__(self, jobs=1):
+        self.jobs = jobs
+        self.headers = None
+
+    def add(self, login, data, headers):
+        self.headers = headers
+        get_evals.process_evaluations(data["scale_teams"], login, headers)
+
+    def finish(self):
+        get_evals.export_alerts_report(self.jobs, self.headers)
+
+
+class ReceivedAlerts:
+    needs = {"profile", "scale_teams"}
+    cpu_bound = False
+
+    def __init__(self):
+        self.logins = []
+
+    def add(self, login, data, headers):
+        self.logins.append(login)
+        received = [e for e in data["scale_teams"]
+                    if any(u.get("login") == login for u in e.get("correcteds", []))]
+        get_user_eval.process_received_evaluations(received, login, headers)
+
+    def finish(self):
+        get_user_eval.check_alerts(", ".join(self.logins))
+
+
+class ReceivedCsv:
+    needs = {"profile", "scale_teams"}
+    cpu_bound = False
+
+    def __init__(self):
+        pass
+
+    def add(self, login, data, headers):
+        received = [e for e in data["scale_teams"]
+                    if any(u.get("login") == login for u in e.get("correcteds", []))]
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        recieved_evals.save_to_csv(received, filename=os.path.join(RESULTS_DIR, f"received_evaluations_{login}.csv"))
+
+    def finish(self):
+        pass
+
+
+class Corrections:
+    needs = {"profile", "as_corrector"}
+    cpu_bound = False
+
+    def __init__(self):
+        self.file = None
+        self.writer = None
+        self.saved = 0
+
+    # rows go straight to a temporary CSV, nothing is kept per login; an
+    # existing evaluaciones.csv is only replaced once the run has finished
+    def add(self, login, data, headers):
+        if self.file is None:
+            keys = ["evaluator_login", "evaluated", "proyect", "final_mark", "comment", "created_at"]
+            self.file = open(CORRECTIONS_FILE + ".tmp", "w", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.file, fieldnames=keys)
+            self.writer.writeheader()
+        for c in data["as_corrector"]:
+            self.writer.writerow(get_users_evals.process_correction(c))
+            self.saved += 1
+
+    def finish(self):
+        if self.file is None:
+            print(f"No corrections fetched, {CORRECTIONS_FILE} left as it was")
+            return
+        self.file.close()
+        os.replace(CORRECTIONS_FILE + ".tmp", CORRECTIONS_FILE)
+        print(f"Saved {self.saved} evaluations in {CORRECTIONS_FILE}")
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+            os.remove(CORRECTIONS_FILE + ".tmp")
+
+
+class Hours:
+    needs = {"locations"}
+    cpu_bound = True
+
+    def __init__(self, jobs=1):
+        self.jobs = jobs
+        self.logins = []
+        self.locations = []
+
+    def add(self, login, data, headers):
+        self.logins.append(login)
+        self.locations.append(data["locations"])
+
+    def finish(self):
+        hours = parallel.map_users(logged_hours.calc_hours, self.locations, self.jobs)
+        results = list(zip(self.logins, hours))
+        print("\nRANKING")
+        for i, (login, hours) in enumerate(sorted(results, key=lambda x: x[1], reverse=True), 1):
+            print(f"{i:2d}. {login}: {hours:.2f} hours")
+
+
+ANALYSES = {
+    "given_alerts": GivenAlerts,
+    "received_alerts": ReceivedAlerts,
+    "received_csv": ReceivedCsv,
+    "corrections": Corrections,
+    "hours": Hours,
+}
+
+# Resources and the ones they depend on, in the order they are fetched
+RESOURCES = {
+    "profile": set(),
+    "scale_teams": {"profile"},
+    "as_corrector": {"profile"},
+    "locations": set(),
+}
+
+
+# Union of the resources the analyses need, with their dependencies, in fetch order
+def plan(analyses):
+    needed = set()
+    for analysis in analyses:
+        for resource in analysis.needs:
+            needed.add(resource)
+            needed.update(RESOURCES[resource])
+    return [resource for resource in RESOURCES if resource in needed]
+
+
+def create(analysis, jobs=1):
+    return analysis(jobs) if analysis.cpu_bound else analysis()
+
+
+# Downloads each planned resource of a login exactly once
+def fetch(login, resources, token, headers):
+    data = {}
+    if "profile" in resources:
+        user_id, level = get_evals.get_user_data(login, headers)
+        get_evals.user_levels[login] = level
+        data["user_id"] = user_id
+    if "scale_teams" in resources:
+        data["scale_teams"] = get_evals.get_given_evaluations(data["user_id"], headers)
+    if "as_corrector" in resources:
+        data["as_corrector"] = get_users_evals.get_user_corrections(data["user_id"])
+    if "locations" in resources:
+        data["locations"] = logged_hours.get_locations(token, login)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several analyses over a cohort with one download.")
+    parser.add_argument("--cohort", required=True, help="file with one login per line")
+    parser.add_argument("--analyses", required=True, help=f"comma separated, any of: {', '.join(ANALYSES)}")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="processes used for the CPU-bound steps")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.analyses.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ANALYSES]
+    if unknown:
+        print(f"[ERROR] Unknown analyses: {', '.join(unknown)}")
+        sys.exit(2)
+    analyses = [create(ANALYSES[n], args.jobs) for n in dict.fromkeys(names)]
+
+    try:
+        with open(args.cohort, "r", encoding="utf-8") as f:
+            logins = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    except FileNotFoundError:
+        print(f"[ERROR] No {args.cohort} found.")
+        sys.exit(2)
+
+    resources = plan(analyses)
+    print(f"{len(logins)} logins, {len(analyses)} analyses, resources per login: {', '.join(resources)}")
+
+    try:
+        token = get_evals.get_token(get_evals.uid, get_evals.secret)
+    except Exception as e:
+        print(f"[ERROR] Cannot obtain token: {e}")
+        sys.exit(2)
+    headers = {"Authorization": f"Bearer {token}"}
+    if any(isinstance(a, GivenAlerts) for a in analyses):
+        project_catalog.prefetch(headers)
+    # the imported scripts share the token and one level table
+    get_users_evals.HEADERS.update(headers)
+    recieved_evals.HEADERS.update(headers)
+    get_user_eval.user_levels = get_evals.user_levels
+
+    try:
+        for i, login in enumerate(logins, 1):
+            print(f"[{i}/{len(logins)}] {login}")
+            try:
+                data = fetch(login, resources, token, headers)
+            except requests.exceptions.HTTPError as e:
+                print(f"   Error with '{login}': {e}")
+                continue
+            for analysis in analyses:
+                analysis.add(login, data, headers)
+
+        for analysis in analyses:
+            analysis.finish()
+    finally:
+        # a run that stops halfway leaves no partial output behind
+        for analysis in analyses:
+            if hasattr(analysis, "close"):
+                analysis.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,28 @@
-import requests
 import time
 from dateutil import parser
 import os
-import sys
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from pathlib import Path
+import api_client
+import parallel
 
 load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
 
 UID = os.getenv("UID")
 SECRET = os.getenv("SECRET")
 BASE_URL = "https://api.intra.42.fr"
+CURSUS_ID = 21  # 42cursus, piscine projects live in other cursus
+DEFAULT_WORKERS = 4
 
 
 def get_token(uid, secret):
     print("get_token -> UID:", uid)
     print("get_token -> SECRET mask:", (secret[:4] + "..." + secret[-4:]) if secret else None)
 
-    res = requests.post(f"{BASE_URL}/oauth/token", data={
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
         "grant_type": "client_credentials",
         "client_id": uid,
         "client_secret": secret,
@@ -33,13 +38,18 @@ def get_token(uid, secret):
     return res.json()["access_token"]
 
 
-def get_projects(token, login):
+# Fetches every projects_users page of a login. With cursus_id the API
+# only returns the projects of that cursus.
+def get_projects(token, login, cursus_id=None):
     url = f"{BASE_URL}/v2/users/{login}/projects_users?per_page=100"
+    if cursus_id is not None:
+        url += f"&filter[cursus]={cursus_id}"
     headers = {"Authorization": f"Bearer {token}"}
     all_projects = []
     while url:
         time.sleep(0.5)
-        res = requests.get(url, headers=headers, timeout=15)
+        # api_client retries 429s; one still left means the rate budget is exhausted
+        res = api_client.get(url, headers=headers, timeout=15)
         if res.status_code != 200:
             print(f"{login} - Error {res.status_code}")
             break
@@ -60,26 +70,10 @@ def calc_days(begin_at, end_at):
         return None  # Skip malformed dates
 
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python script.py <login>")
-        return
-
-    login = sys.argv[1]
-    
-    if not UID or not SECRET:
-        print("Environment variables UID and SECRET are required. Set them in your .env or environment.")
-        return
-
-    try:
-        token = get_token(UID, SECRET)
-    except Exception as e:
-        print(f"Error getting token: {e}")
-        return
-
-    print(f"Processing '{login}'…")
-    projects = get_projects(token, login)
-    
+# Walks the projects of a login in order and returns (login, project, days)
+# tuples, where days go from the end of the previous project to the end of
+# the current one.
+def project_durations(login, projects, verbose=True):
     common_core_started = False
     prev_end_date = None
     results = []
@@ -91,27 +85,125 @@ def main():
         if project_name == "common_core" and not common_core_started:
             common_core_started = True
             prev_end_date = begin_at  # Use the start of the common core as the first project start date
-            print(f"\t{login} - First Project (Common Core) Start: {begin_at}")
+            if verbose:
+                print(f"\t{login} - First Project (Common Core) Start: {begin_at}")
             continue  # Skip duration calculation for common core
 
         if begin_at and end_at and prev_end_date:
             # Calculate days between the end date of the previous project and the end date of the current one
             days = calc_days(prev_end_date, end_at)
             if days is not None:
-                print(f"\t{login} - Project: {project_name}")
-                print(f"\t\tStart: {prev_end_date} | End: {end_at} | Duration: {days} days")
+                if verbose:
+                    print(f"\t{login} - Project: {project_name}")
+                    print(f"\t\tStart: {prev_end_date} | End: {end_at} | Duration: {days} days")
                 results.append((login, project_name, days))
                 prev_end_date = end_at  # The end date of this project will be the start date for the next project
-            else:
+            elif verbose:
                 print(f"\n\t{login} - Project: {project_name} has invalid dates.")
-        else:
+        elif verbose:
             print(f"\n\t{login} - Project: {project_name} has missing dates.")
+    return results
+
+
+# Linear interpolation between the closest ranks, values must be sorted
+def percentile(values, q):
+    if not values:
+        return None
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
 
+
+def read_logins(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def print_ranking(results):
     sorted_results = sorted(results, key=lambda x: x[2], reverse=True)
     print("\n-- RANKING --")
     for i, (login, project_name, days) in enumerate(sorted_results, 1):
         print(f"{i:2d}. {login} - {project_name}: {days} days")
 
 
+def print_project_stats(results):
+    per_project = defaultdict(list)
+    for _, project_name, days in results:
+        per_project[project_name].append(days)
+
+    print("\n-- PROJECT STATS (days) --")
+    print(f"{'Project':<30} {'n':>5} {'min':>6} {'p25':>6} {'p50':>6} {'p75':>6} {'p90':>6} {'max':>6}")
+    for project_name in sorted(per_project, key=lambda p: percentile(sorted(per_project[p]), 50), reverse=True):
+        values = sorted(per_project[project_name])
+        p25, p50, p75, p90 = (percentile(values, q) for q in (25, 50, 75, 90))
+        print(f"{project_name:<30} {len(values):>5} {values[0]:>6} {p25:>6.1f} {p50:>6.1f} "
+              f"{p75:>6.1f} {p90:>6.1f} {values[-1]:>6}")
+
+
+# Fetches the 42cursus projects of every login concurrently, then computes
+# the durations of the whole cohort on `jobs` processes.
+def cohort_durations(token, logins, workers, jobs=1):
+    histories = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(get_projects, token, login, CURSUS_ID): login for login in logins}
+        for i, future in enumerate(as_completed(futures), 1):
+            login = futures[future]
+            try:
+                histories[login] = future.result()
+            except Exception as e:
+                print(f"[{i}/{len(logins)}] {login} - Error: {e}")
+                continue
+            print(f"[{i}/{len(logins)}] {login} - {len(histories[login])} projects")
+
+    # sorted so the merged ranking does not depend on download order
+    args_list = [(login, histories[login], False) for login in sorted(histories)]
+    results = []
+    for durations in parallel.starmap(project_durations, args_list, jobs):
+        results.extend(durations)
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Days spent per project of one login or a whole cohort.")
+    arg_parser.add_argument("login", nargs="?", help="login to process")
+    arg_parser.add_argument("--cohort", help="file with one login per line, builds a single ranking for all of them")
+    arg_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent requests in cohort mode")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=1, help="processes used to compute durations in cohort mode")
+    args = arg_parser.parse_args()
+
+    if bool(args.login) == bool(args.cohort):
+        print("Usage: python script.py <login> | --cohort FILE [--workers N] [--jobs N]")
+        return
+
+    if not UID or not SECRET:
+        print("Environment variables UID and SECRET are required. Set them in your .env or environment.")
+        return
+
+    try:
+        token = get_token(UID, SECRET)
+    except Exception as e:
+        print(f"Error getting token: {e}")
+        return
+
+    if args.cohort:
+        try:
+            logins = read_logins(args.cohort)
+        except FileNotFoundError:
+            print(f"No {args.cohort} found.")
+            return
+        print(f"Processing {len(logins)} logins with {args.workers} workers…")
+        results = cohort_durations(token, logins, args.workers, args.jobs)
+        print_ranking(results)
+        print_project_stats(results)
+        return
+
+    login = args.login
+    print(f"Processing '{login}'…")
+    projects = get_projects(token, login)
+    results = project_durations(login, projects)
+    print_ranking(results)
+
+
 if __name__ == "__main__":
     main()
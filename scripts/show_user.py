@@ -4,10 +4,20 @@ show_user_json.py
 
 Uso:
   python show_user_json.py <login> [--raw] [--out FILENAME]
+  python show_user_json.py <login> <login>... [--file FILE|-] [--fields F1,F2] [--workers 8]
+
+Con varios logins (argumentos, fichero o stdin) se piden en paralelo y cada
+resultado se escribe como una línea JSON (NDJSON) en cuanto llega, en el orden
+en que terminan. --fields proyecta campos: rutas con puntos, y [N] en una lista
+elige el elemento cuyo id propio vale N (cursus_id en cursus_users, project.id
+en projects_users, id en el resto; la posición N si no son objetos).
+[clave=valor] elige por cualquier campo, p.ej. cursus_users[grade=Transcender].
 
 Ejemplos:
   python show_user_json.py josehurt
   python show_user_json.py josehurt --out josehurt.json
+  python show_user_json.py --file users/users.txt --fields login,cursus_users[21].level,cursus_users[21].grade
+  cat logins.txt | python show_user_json.py - --fields login,location | jq .
 """
 
 import sys
@@ -15,8 +25,10 @@ import os
 import json
 import argparse
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
+import api_client
 
 # Cargar .env desde el mismo directorio del script
 load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
@@ -26,11 +38,20 @@ API_BASE = "https://api.intra.42.fr/v2"
 UID = os.getenv("UID")
 SECRET = os.getenv("SECRET")
 TIMEOUT = 15
+WORKERS = 8
+# Campo que identifica a los elementos de cada lista del perfil para [N]
+ID_KEYS = {
+    "cursus_users": "cursus_id",
+    "projects_users": "project.id",
+    "campus_users": "campus_id",
+    "languages_users": "language_id",
+    "expertises_users": "expertise_id",
+}
 
 def get_token(uid, secret):
     if not uid or not secret:
         raise RuntimeError("UID y SECRET no están definidas en el .env")
-    res = requests.post(f"{BASE_URL}/oauth/token", data={
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
         "grant_type": "client_credentials",
         "client_id": uid,
         "client_secret": secret,
@@ -38,30 +59,127 @@ def get_token(uid, secret):
     res.raise_for_status()
     return res.json().get("access_token")
 
-def fetch_user(login, token):
+def fetch_user(login, token, priority="interactive"):
     url = f"{API_BASE}/users/{login}"
     headers = {"Authorization": f"Bearer {token}"}
-    res = requests.get(url, headers=headers, timeout=TIMEOUT)
+    res = api_client.get(url, headers=headers, timeout=TIMEOUT, priority=priority)
     if res.status_code == 404:
         raise FileNotFoundError(f"Usuario '{login}' no encontrado (404)")
     res.raise_for_status()
     return res.json()
 
+# Valor de una ruta como "cursus_users[21].level" o None si no existe
+def get_path(data, path):
+    for part in path.split("."):
+        key, _, index = part.partition("[")
+        if key:
+            data = data.get(key) if isinstance(data, dict) else None
+        if index:
+            data = select(data, index.rstrip("]"), key)
+        if data is None:
+            return None
+    return data
+
+
+# Elemento de una lista por [N] (id propio de la lista) o [clave=valor]
+def select(items, index, list_name=""):
+    if not isinstance(items, list):
+        return None
+    key, eq, value = index.partition("=")
+    if not eq:
+        key, value = ID_KEYS.get(list_name, "id"), index
+    if items and not isinstance(items[0], dict):
+        try:
+            n = int(value)
+        except ValueError:
+            return None
+        return items[n] if -len(items) <= n < len(items) else None
+    for item in items:
+        found = get_path(item, key) if isinstance(item, dict) else None
+        if found is not None and str(found) == value:
+            return item
+    return None
+
+
+def project(data, fields):
+    if not fields:
+        return data
+    return {field: get_path(data, field) for field in fields}
+
+
+# Logins de los argumentos, del fichero y de stdin. stdin se lee una sola vez
+# aunque se pida con '-' y con --file - a la vez, y no se cierra.
+def read_logins(args):
+    logins = [login for login in args.login if login != "-"]
+    from_stdin = "-" in args.login or args.file == "-"
+    if args.file and args.file != "-":
+        with open(args.file, "r", encoding="utf-8") as f:
+            logins.extend(line.strip() for line in f)
+    if from_stdin or (not logins and not args.file and not sys.stdin.isatty()):
+        logins.extend(line.strip() for line in sys.stdin)
+    return list(dict.fromkeys(login for login in logins if login))
+
+
+# Pide los logins en paralelo y escribe una línea JSON por login según terminan.
+# Devuelve cuántos fallaron.
+def stream_users(logins, token, fields, workers, out):
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_user, login, token, "bulk"): login for login in logins}
+        for future in as_completed(futures):
+            login = futures[future]
+            try:
+                record = project(future.result(), fields)
+            except Exception as e:
+                failed += 1
+                record = {"login": login, "error": str(e)}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    return failed
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Mostrar JSON completo de un usuario de 42.")
-    parser.add_argument("login", help="login del usuario")
+    parser = argparse.ArgumentParser(description="Mostrar JSON completo de uno o varios usuarios de 42.")
+    parser.add_argument("login", nargs="*", help="login(s) del usuario, '-' lee de stdin")
+    parser.add_argument("--file", "-f", help="fichero con un login por línea ('-' para stdin)")
+    parser.add_argument("--fields", help="campos a mostrar, p.ej. login,cursus_users[21].level")
+    parser.add_argument("--workers", "-w", type=int, default=WORKERS, help=f"peticiones en paralelo (por defecto {WORKERS})")
+    parser.add_argument("--ndjson", action="store_true", help="Una línea JSON por usuario aunque sea uno solo")
     parser.add_argument("--raw", action="store_true", help="Imprime JSON sin formatear (compacto)")
     parser.add_argument("--out", "-o", help="Guardar salida JSON en archivo")
     args = parser.parse_args()
 
+    try:
+        logins = read_logins(args)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(2)
+    if not logins:
+        parser.error("indica al menos un login")
+    fields = [f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else None
+
     try:
         token = get_token(UID, SECRET)
     except Exception as e:
         print(f"[ERROR] No se pudo obtener token: {e}", file=sys.stderr)
         sys.exit(2)
 
+    if len(logins) > 1 or args.ndjson:
+        out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+        try:
+            failed = stream_users(logins, token, fields, max(1, args.workers), out)
+        finally:
+            if args.out:
+                out.close()
+        if args.out:
+            print(f"Guardado en {args.out}", file=sys.stderr)
+        if failed:
+            print(f"[ERROR] {failed} de {len(logins)} logins fallaron", file=sys.stderr)
+            sys.exit(3)
+        return
+
     try:
-        data = fetch_user(args.login, token)
+        data = project(fetch_user(logins[0], token), fields)
     except FileNotFoundError as e:
         print(f"[ERROR] {e}", file=sys.stderr)
         sys.exit(3)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+snapshots.py
+
+Versioned, gzip compressed snapshots of listings (campus, campus users...)
+and key based diffs between two of them, so later jobs only process the
+entities that changed.
+
+Uso:
+  python snapshots.py list <name>
+  python snapshots.py diff <name> [--key login]     latest snapshot against the previous one
+"""
+
+import os
+import sys
+import gzip
+import json
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", Path(__file__).parent / "../results/snapshots"))
+
+
+# Stores the records as a new version of `name` and returns its path
+def save_snapshot(name, records):
+    folder = SNAPSHOT_DIR / name
+    folder.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = folder / f"{stamp}.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False)
+    return path
+
+
+# Snapshot paths of `name`, oldest first
+def list_snapshots(name):
+    folder = SNAPSHOT_DIR / name
+    if not folder.exists():
+        return []
+    return sorted(folder.glob("*.json.gz"))
+
+
+def load_snapshot(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# The n-th newest snapshot (0 = latest) or None
+def latest(name, n=0):
+    paths = list_snapshots(name)
+    if len(paths) <= n:
+        return None
+    return paths[-1 - n]
+
+
+# Compares two lists of records by `key` in linear time. Only `fields` are
+# compared when given. Returns added and removed records and, for changed
+# ones, {field: (old, new)}.
+def diff(old, new, key, fields=None):
+    old_by_key = {r[key]: r for r in old if r.get(key) is not None}
+    new_by_key = {r[key]: r for r in new if r.get(key) is not None}
+
+    added = [r for k, r in new_by_key.items() if k not in old_by_key]
+    removed = [r for k, r in old_by_key.items() if k not in new_by_key]
+    changed = {}
+    for k, record in new_by_key.items():
+        previous = old_by_key.get(k)
+        if previous is None:
+            continue
+        names = fields or set(previous) | set(record)
+        changes = {f: (previous.get(f), record.get(f)) for f in names if previous.get(f) != record.get(f)}
+        if changes:
+            changed[k] = changes
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+# Keys that downstream jobs need to process again: new or changed
+def changed_keys(result, key):
+    return [r[key] for r in result["added"]] + list(result["changed"])
+
+
+def print_diff(result, key):
+    print(f"{len(result['added'])} new, {len(result['removed'])} removed, {len(result['changed'])} changed")
+    for r in result["added"]:
+        print(f"  + {r[key]}")
+    for r in result["removed"]:
+        print(f"  - {r[key]}")
+    for k, changes in result["changed"].items():
+        detail = ", ".join(f"{f}: {a} -> {b}" for f, (a, b) in sorted(changes.items()))
+        print(f"  ~ {k} ({detail})")
+
+
+# Saves `records` and diffs them against the previous snapshot of `name`.
+# Returns the diff, or None on the first snapshot.
+def save_and_diff(name, records, key, fields=None):
+    previous = latest(name)
+    save_snapshot(name, records)
+    if previous is None:
+        return None
+    return diff(load_snapshot(previous), records, key, fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List and compare listing snapshots.")
+    parser.add_argument("command", choices=["list", "diff"])
+    parser.add_argument("name", help="snapshot name, e.g. campus or campus_users")
+    parser.add_argument("--key", default="login", help="field identifying a record (default login)")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for path in list_snapshots(args.name):
+            print(path.name)
+        return
+
+    new, old = latest(args.name), latest(args.name, 1)
+    if old is None:
+        print(f"Need two snapshots of '{args.name}' in {SNAPSHOT_DIR} to compare.")
+        sys.exit(1)
+    print(f"{old.name} -> {new.name}")
+    print_diff(diff(load_snapshot(old), load_snapshot(new), args.key), args.key)
+
+
+if __name__ == "__main__":
+    main()
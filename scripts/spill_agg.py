@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+spill_agg.py
+
+Campus-wide evaluator x evaluated counts within a memory budget. Counts are
+kept in a dict until it reaches the budget, then written to disk as a sorted
+run and the dict starts again. Reading merges the runs with the dict in key
+order, so each evaluator's counter is rebuilt one at a time and the given
+evaluations alert rule of get_evals.py runs over it straight away. Alerts
+are written to the XLSX row by row.
+
+Input is evaluaciones.csv (get_users_evals.py) or scale_teams as JSON Lines
+(API shape, e.g. gen_synthetic.py). Levels are read offline from the user
+index (user_index.py) or a users JSONL; pairs without a level are not
+counted, as in get_evals.py, and only the project categories of
+project_catalog.INCLUDED count.
+
+Uso:
+  python spill_agg.py evaluaciones.csv [--memory-mb 256] [--out results/campus_alerts.xlsx]
+  python spill_agg.py results/synthetic/scale_teams.jsonl --users results/synthetic/users.jsonl
+"""
+
+import os
+import csv
+import sys
+import gzip
+import json
+import heapq
+import shutil
+import argparse
+import tempfile
+from collections import defaultdict
+from itertools import groupby
+
+from openpyxl import Workbook
+
+import get_evals
+import user_index
+import project_catalog
+
+MEMORY_MB = int(os.getenv("AGG_MEMORY_MB", "256"))
+ENTRY_BYTES = 250  # rough size of one (evaluator, evaluated) -> count entry in a dict
+MAX_RUNS = 64  # runs merged at once, more are compacted first
+OUT_FILE = "results/campus_alerts.xlsx"
+
+
+# Additive counter keyed by (evaluator, evaluated) that spills sorted runs to disk
+class SpillCounter:
+    def __init__(self, memory_mb=MEMORY_MB, spill_dir=None):
+        self.max_entries = max(1000, memory_mb * 1024 * 1024 // ENTRY_BYTES)
+        self.counts = defaultdict(int)
+        self.runs = []
+        self.spilled = 0
+        self.written = 0
+        self.tmp = tempfile.mkdtemp(prefix="spill_agg_", dir=spill_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def add(self, evaluator, evaluated, delta):
+        self.counts[(evaluator, evaluated)] += delta
+        if len(self.counts) >= self.max_entries:
+            self.spill()
+
+    def spill(self):
+        if not self.counts:
+            return
+        self.spilled += len(self.counts)
+        self.runs.append(self._write((a, b, n) for (a, b), n in sorted(self.counts.items())))
+        self.counts.clear()
+        if len(self.runs) > MAX_RUNS:
+            merged = self._write(self._merge(self._read(path) for path in self.runs))
+            for path in self.runs:
+                os.remove(path)
+            self.runs = [merged]
+
+    def _write(self, rows):
+        self.written += 1
+        path = os.path.join(self.tmp, f"run{self.written:05d}.tsv.gz")
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=1) as f:
+            for a, b, n in rows:
+                f.write(f"{a}\t{b}\t{n}\n")
+        return path
+
+    @staticmethod
+    def _read(path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                a, b, n = line.rstrip("\n").split("\t")
+                yield a, b, int(n)
+
+    # Sorted runs merged into one sorted stream, counts of equal keys added up
+    @staticmethod
+    def _merge(runs):
+        for (a, b), rows in groupby(heapq.merge(*runs), key=lambda r: (r[0], r[1])):
+            yield a, b, sum(n for _, _, n in rows)
+
+    # (evaluator, evaluated, count) in key order, over the runs and the dict
+    def items(self):
+        memory = ((a, b, n) for (a, b), n in sorted(self.counts.items()))
+        return self._merge([memory] + [self._read(path) for path in self.runs])
+
+    # (evaluator, {evaluated: count}), one evaluator in memory at a time
+    def by_evaluator(self):
+        for evaluator, rows in groupby(self.items(), key=lambda r: r[0]):
+            yield evaluator, {b: n for _, b, n in rows}
+
+
+# (evaluator, evaluated, delta) of evaluaciones.csv
+def read_csv(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                final_mark = float(row.get("final_mark") or "")
+            except ValueError:
+                continue  # no final grade
+            if not project_catalog.included(None, row.get("proyect") or ""):
+                continue
+            yield row["evaluator_login"], row["evaluated"], 1 if final_mark >= 100 else -1
+
+
+# (evaluator, evaluated, delta) of scale_teams in JSON Lines
+def read_scale_teams(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            e = json.loads(line)
+            final_mark = e.get("final_mark")
+            evaluator = (e.get("corrector") or {}).get("login")
+            if final_mark is None or not evaluator:
+                continue
+            project_id, project_name = project_catalog.team_project(e.get("team") or {})
+            if not project_catalog.included(project_id, project_name):
+                continue
+            for user in e.get("correcteds", []):
+                yield evaluator, user.get("login"), 1 if final_mark >= 100 else -1
+
+
+def read_levels(users_file=None):
+    levels = user_index.stored_levels()
+    if users_file:
+        with open(users_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    user = json.loads(line)
+                    levels[user["login"]] = next((c.get("level") for c in user.get("cursus_users", [])
+                                                  if c.get("cursus_id") == 21), None)
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Campus-wide evaluation counts and alerts within a memory budget.")
+    parser.add_argument("input", help="evaluaciones.csv or scale_teams .jsonl")
+    parser.add_argument("--users", help="users .jsonl with cursus_users levels (besides the user index)")
+    parser.add_argument("--memory-mb", type=int, default=MEMORY_MB, help=f"budget for the counts (default {MEMORY_MB})")
+    parser.add_argument("--spill-dir", help="where runs are written (default: system temp dir)")
+    parser.add_argument("--out", default=OUT_FILE, help=f"XLSX to write (default {OUT_FILE})")
+    args = parser.parse_args()
+
+    levels = read_levels(args.users)
+    print(f"{len(levels)} levels loaded")
+    reader = read_scale_teams if args.input.endswith(".jsonl") else read_csv
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Alerts")
+    ws.append([
+        "Evaluator", "Evaluator Level",
+        "Evaluated", "Evaluated Level",
+        "Number of Evaluations", "% of Total", "Adjusted"
+    ])
+
+    count = 0
+    try:
+        with SpillCounter(args.memory_mb, args.spill_dir) as counter:
+            rows = 0
+            for evaluator, evaluated, delta in reader(args.input):
+                rows += 1
+                if evaluated and evaluated != evaluator and levels.get(evaluated) is not None \
+                        and levels.get(evaluator) is not None:
+                    counter.add(evaluator, evaluated, delta)
+            counter.spill()
+            print(f"{rows} evaluations, {counter.spilled} partial counts in {len(counter.runs)} runs")
+
+            for evaluator, pairs in counter.by_evaluator():
+                for evaluated, times, porcentaje, adjusted_times in get_evals.pair_alerts(levels[evaluator], pairs):
+                    ws.append([
+                        evaluator, levels[evaluator],
+                        evaluated, levels[evaluated],
+                        times, f"{porcentaje:.0%}", adjusted_times
+                    ])
+                    count += 1
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    wb.save(args.out)
+    print(f"{count} alerts saved in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+sweep_thresholds.py
+
+What-if analysis of the evaluation alert rule. Loads the pair counts and
+levels saved by get_evals.py (results/pair_counts.json) once and evaluates a
+grid of rule parameters with numpy, without any API request.
+
+For every combination it reports the number of alerts and how many pairs
+appear or disappear compared with the current rule of get_evals.py.
+
+Uso:
+  python sweep_thresholds.py --total-cutoff 9,11,13 --share 0.05,0.1,0.2
+  python sweep_thresholds.py --fixed-threshold 1 --show-flips 20     (get_pisciners_evals.py rule)
+"""
+
+import csv
+import sys
+import json
+import argparse
+import itertools
+
+import numpy as np
+
+import get_evals
+
+PARAMS = [
+    # (name, type, default from get_evals)
+    ("min_times", int, get_evals.MIN_TIMES),
+    ("base_threshold", float, get_evals.BASE_THRESHOLD),
+    ("base_level", float, get_evals.BASE_LEVEL),
+    ("level_offset", float, get_evals.LEVEL_OFFSET),
+    ("total_cutoff", int, get_evals.TOTAL_CUTOFF),
+    ("share", float, get_evals.SHARE),
+    ("penalty_high", int, get_evals.PENALTY_HIGH),
+    ("penalty_low", int, get_evals.PENALTY_LOW),
+]
+
+
+# Flattens {evaluator: {evaluated: times}} into one row per pair
+def load_pairs(path=get_evals.PAIR_COUNTS_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    levels = data["levels"]
+
+    pairs, times, eval_levels, totals = [], [], [], []
+    for evaluator, counter in data["counts"].items():
+        level = levels.get(evaluator)
+        if level is None:
+            continue
+        total = sum(abs(v) for v in counter.values())
+        for evaluated, n in counter.items():
+            pairs.append((evaluator, evaluated))
+            times.append(n)
+            eval_levels.append(level)
+            totals.append(total)
+    return pairs, np.array(times, dtype=np.int64), np.array(eval_levels, dtype=float), np.array(totals, dtype=np.int64)
+
+
+# Boolean mask of the pairs that alert with the given parameters.
+# fixed_threshold replaces the level based threshold when set.
+def alert_mask(times, levels, totals, min_times, base_threshold, base_level, level_offset,
+               total_cutoff, share, penalty_high, penalty_low, fixed_threshold=None):
+    if fixed_threshold is None:
+        # np.round rounds half to even like the built-in round() of the rule
+        threshold = np.where(levels <= base_level, base_threshold, np.round(levels - level_offset))
+    else:
+        threshold = np.full(len(times), fixed_threshold)
+    percent = np.divide(times, totals, out=np.zeros(len(times)), where=totals > 0)
+    penalty = np.where(totals > total_cutoff, np.where(percent > share, penalty_high, penalty_low), 0)
+    return (times > min_times) & (times + penalty > threshold)
+
+
+def parse_list(kind):
+    def parse(text):
+        return [None if v.strip().lower() == "none" else kind(v) for v in text.split(",")]
+    return parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a grid of alert rule parameters over cached counts.")
+    parser.add_argument("--counts", default=get_evals.PAIR_COUNTS_FILE, help="pair counts saved by get_evals.py")
+    for name, kind, default in PARAMS:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=parse_list(kind), default=[default],
+                            help=f"comma separated values (default {default})")
+    parser.add_argument("--fixed-threshold", type=parse_list(float), default=[None],
+                        help="fixed thresholds instead of the level based one, 'none' keeps it")
+    parser.add_argument("--show-flips", type=int, default=0, metavar="N",
+                        help="list up to N pairs that flip for each setting")
+    parser.add_argument("--csv", help="also write the results to this CSV")
+    args = parser.parse_args()
+
+    try:
+        pairs, times, levels, totals = load_pairs(args.counts)
+    except FileNotFoundError:
+        print(f"No {args.counts} found, run get_evals.py first.")
+        sys.exit(1)
+    print(f"{len(pairs)} pairs loaded from {args.counts}")
+
+    defaults = {name: default for name, _, default in PARAMS}
+    baseline = alert_mask(times, levels, totals, **defaults)
+    print(f"Current rule: {int(baseline.sum())} alerts\n")
+
+    names = [name for name, _, _ in PARAMS] + ["fixed_threshold"]
+    grid = itertools.product(*(getattr(args, name) for name in names))
+    rows = []
+    print(" ".join(f"{n:>15}" for n in names) + f" {'alerts':>7} {'new':>5} {'gone':>5}")
+    for values in grid:
+        params = dict(zip(names, values))
+        mask = alert_mask(times, levels, totals, **params)
+        new = np.flatnonzero(mask & ~baseline)
+        gone = np.flatnonzero(baseline & ~mask)
+        rows.append({**params, "alerts": int(mask.sum()), "new": len(new), "gone": len(gone)})
+        print(" ".join(f"{str(v):>15}" for v in values) + f" {int(mask.sum()):>7} {len(new):>5} {len(gone):>5}")
+        for label, indexes in (("+", new), ("-", gone)):
+            for i in indexes[:args.show_flips]:
+                evaluator, evaluated = pairs[i]
+                print(f"    {label} {evaluator} -> {evaluated} ({times[i]} of {totals[i]}, level {levels[i]:.2f})")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=names + ["alerts", "new", "gone"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nSaved {len(rows)} settings in {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
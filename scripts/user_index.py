@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+user_index.py
+
+Persistent login -> user id index (plus campus and 42cursus level snapshot),
+so scripts can skip the profile request they only needed for the id.
+
+Uso:
+  python user_index.py [--campus 37]     build/refresh the index from the campus listings
+  python user_index.py --show <login>    print the stored entry of a login
+
+Other scripts call user_id(), login_of() and cached_level() before any
+per-user request, and remember() what they learn from the ones they still do.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import threading
+import requests
+from pathlib import Path
+from dotenv import load_dotenv
+import api_client
+
+load_dotenv(dotenv_path=Path(__file__).parent / "../.env")
+
+API_BASE = "https://api.intra.42.fr/v2"
+BASE_URL = "https://api.intra.42.fr"
+UID = os.getenv("UID")
+SECRET = os.getenv("SECRET")
+
+INDEX_FILE = Path(os.getenv("USER_INDEX_FILE", Path(__file__).parent / "../users/user_index.json"))
+CAMPUS_ID = int(os.getenv("CAMPUS_ID", "37"))  # Malaga campus by default
+CURSUS_ID = 21  # 42cursus
+LEVEL_MAX_AGE = float(os.getenv("USER_INDEX_MAX_AGE", "24")) * 3600  # levels older than this are refreshed
+REQUEST_DELAY = 0.5
+
+_users = None  # login -> {"id", "campus_id", "level", "level_at", "grade", "grade_at"}
+_logins_by_id = {}
+_dirty = False
+_lock = threading.Lock()
+
+
+def get_token(uid, secret):
+    if not uid or not secret:
+        raise RuntimeError("UID y SECRET should be on .env")
+    res = api_client.post(f"{BASE_URL}/oauth/token", data={
+        "grant_type": "client_credentials",
+        "client_id": uid,
+        "client_secret": secret
+    }, timeout=10)
+    res.raise_for_status()
+    return res.json()["access_token"]
+
+
+def _load():
+    global _users
+    if _users is not None:
+        return _users
+    try:
+        with INDEX_FILE.open("r", encoding="utf-8") as f:
+            users = json.load(f).get("users", {})
+    except (OSError, ValueError):
+        users = {}
+    _logins_by_id.clear()
+    _logins_by_id.update({entry["id"]: login for login, entry in users.items() if entry.get("id")})
+    _users = users
+    return _users
+
+
+def save():
+    global _dirty
+    with _lock:
+        if _users is None:
+            return
+        INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = INDEX_FILE.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"users": _users}, f, ensure_ascii=False)
+        os.replace(tmp, INDEX_FILE)
+        _dirty = False
+
+
+# Stored id of a login, or None when the index does not know it
+def user_id(login):
+    with _lock:
+        entry = _load().get(login)
+    return entry.get("id") if entry else None
+
+
+def login_of(user_id):
+    with _lock:
+        _load()
+        return _logins_by_id.get(user_id)
+
+
+# Entry of a login with a level snapshot younger than max_age, or None
+def cached_entry(login, max_age=LEVEL_MAX_AGE):
+    with _lock:
+        entry = _load().get(login)
+    if not entry or "level_at" not in entry or time.time() - entry["level_at"] > max_age:
+        return None
+    return entry
+
+
+# Returns (found, level). A found level can still be None (user not in 42cursus).
+def cached_level(login, max_age=LEVEL_MAX_AGE):
+    entry = cached_entry(login, max_age)
+    if entry is None:
+        return False, None
+    return True, entry.get("level")
+
+
+# Returns (found, grade). Only a grade stored by a caller that knew it counts,
+# requests that only read the level leave it untouched.
+def cached_grade(login, max_age=LEVEL_MAX_AGE):
+    with _lock:
+        entry = _load().get(login)
+    if not entry or entry.get("grade") is None or time.time() - entry.get("grade_at", 0) > max_age:
+        return False, None
+    return True, entry["grade"]
+
+
+# {login: level} of every entry with a stored level, however old (offline analyses)
+def stored_levels():
+    with _lock:
+        return {login: entry.get("level") for login, entry in _load().items() if "level_at" in entry}
+
+
+# Stores what a per-user request returned, the index is saved at exit. The
+# grade is only replaced when given, most callers only know the level.
+def remember(login, user_id, level=None, campus_id=None, grade=None, with_level=True):
+    global _dirty
+    with _lock:
+        users = _load()
+        entry = users.setdefault(login, {})
+        entry["id"] = user_id
+        if campus_id is not None:
+            entry["campus_id"] = campus_id
+        if with_level:
+            entry["level"] = level
+            entry["level_at"] = time.time()
+            if grade is not None:
+                entry["grade"] = grade
+                entry["grade_at"] = entry["level_at"]
+        _logins_by_id[user_id] = login
+        _dirty = True
+
+
+def _save_if_dirty():
+    if _dirty:
+        save()
+
+
+atexit.register(_save_if_dirty)
+
+
+# Every page of a listing endpoint with the given filters (429s are retried by api_client)
+def get_all_paginated(url, token, params=None):
+    headers = {"Authorization": f"Bearer {token}"}
+    all_data = []
+    page = 1
+    while True:
+        res = api_client.get(url, headers=headers, params={**(params or {}), "page": page, "per_page": 100})
+        res.raise_for_status()
+        data = res.json()
+        if not data:
+            break
+        all_data.extend(data)
+        print(f"   {url.rsplit('/v2/', 1)[-1]} page {page}: {len(data)} elements")
+        page += 1
+        time.sleep(REQUEST_DELAY)
+    return all_data
+
+
+# Rebuilds the entries of a campus from two listings: the campus users (ids)
+# and the 42cursus cursus_users of the campus (levels and grades).
+def build(token, campus_id=CAMPUS_ID):
+    users = get_all_paginated(f"{API_BASE}/campus/{campus_id}/users", token)
+    cursus_users = get_all_paginated(f"{API_BASE}/cursus/{CURSUS_ID}/cursus_users", token,
+                                     {"filter[campus_id]": campus_id})
+    levels = {cu["user"]["login"]: cu for cu in cursus_users if cu.get("user")}
+
+    for user in users:
+        login = user.get("login")
+        if not login:
+            continue
+        cu = levels.get(login) or {}
+        remember(login, user["id"], cu.get("level"), campus_id, cu.get("grade"))
+    save()
+    return len(users), len(levels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the persistent login -> user id index.")
+    parser.add_argument("--campus", type=int, default=CAMPUS_ID, help="campus id to index")
+    parser.add_argument("--show", metavar="LOGIN", help="print the stored entry of a login")
+    args = parser.parse_args()
+
+    if args.show:
+        entry = _load().get(args.show)
+        if entry is None:
+            print(f"{args.show} is not in {INDEX_FILE}")
+            sys.exit(1)
+        print(json.dumps({"login": args.show, **entry}, indent=2, ensure_ascii=False))
+        return
+
+    try:
+        token = get_token(UID, SECRET)
+    except Exception as e:
+        print(f"[ERROR] cannot get TOKEN: {e}")
+        return
+
+    try:
+        n_users, n_levels = build(token, args.campus)
+    except requests.HTTPError as he:
+        code = he.response.status_code if he.response is not None else "?"
+        print(f"[ERROR] HTTP {code}: {he}")
+        return
+    print(f"Indexed {n_users} users of campus {args.campus} ({n_levels} with a 42cursus level) in {INDEX_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# every file the scripts keep between runs goes to a scratch folder
+SCRATCH = Path(tempfile.mkdtemp(prefix="scripts_tests_"))
+os.environ["HTTP_CACHE"] = "0"
+os.environ["USER_INDEX_FILE"] = str(SCRATCH / "user_index.json")
+os.environ["SNAPSHOT_DIR"] = str(SCRATCH / "snapshots")
+os.environ["PROJECT_CATALOG_FILE"] = str(SCRATCH / "project_catalog.json")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+
+@pytest.fixture
+def evals_state():
+    import get_evals
+    state = (get_evals.evaluations_map, get_evals.user_levels, get_evals.scale_team_deltas,
+             get_evals.scale_team_dates, get_evals.evaluated_ids)
+    for d in state:
+        d.clear()
+    yield get_evals
+    for d in state:
+        d.clear()
+
+
+@pytest.fixture
+def index(monkeypatch):
+    import user_index
+    monkeypatch.setattr(user_index, "_users", {})
+    monkeypatch.setattr(user_index, "_logins_by_id", {})
+    monkeypatch.setattr(user_index, "_dirty", False)
+    return user_index
+
+
+# api_client prints its counters at exit, when pytest has closed the captured streams
+def pytest_sessionfinish(session, exitstatus):
+    api_client = sys.modules.get("api_client")
+    if api_client is not None:
+        api_client.stats.clear()
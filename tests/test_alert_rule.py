@@ -0,0 +1,46 @@
+import itertools
+
+import numpy as np
+
+import get_evals
+import sweep_thresholds
+
+
+def test_threshold_follows_the_level():
+    # up to BASE_LEVEL the threshold is BASE_THRESHOLD, then round(level - LEVEL_OFFSET)
+    assert get_evals.pair_alert(2.0, 3, 3) is None
+    assert get_evals.pair_alert(2.0, 4, 4) == (1.0, 4)
+    assert get_evals.pair_alert(7.4, 6, 6) is None
+    assert get_evals.pair_alert(7.4, 7, 7) == (1.0, 7)
+
+
+def test_min_times_never_alerts():
+    assert get_evals.pair_alert(0.0, get_evals.MIN_TIMES, 1) is None
+
+
+def test_penalties_apply_over_the_cutoff():
+    # 4 of 12: over SHARE, +PENALTY_HIGH
+    assert get_evals.pair_alert(5.0, 4, 12) == (4 / 12, 9)
+    # 4 of 11: at the cutoff, no penalty
+    assert get_evals.pair_alert(5.0, 4, 11) is None
+    # 5 of 60: under SHARE, PENALTY_LOW
+    assert get_evals.pair_alert(2.0, 5, 60) is None
+    assert get_evals.pair_alert(2.0, 6, 60) == (0.1, 4)
+
+
+def test_pair_alerts_uses_the_absolute_total():
+    alerts = get_evals.pair_alerts(1.0, {"x": 4, "y": -3, "z": 1})
+    assert [(a[0], a[1]) for a in alerts] == [("x", 4)]
+    assert alerts[0][2] == 4 / 8
+
+
+def test_sweep_mask_matches_the_rule():
+    cases = list(itertools.product([0.5, 2.0, 3.5, 7.5, 12.0], range(0, 12), [1, 5, 11, 12, 40, 200]))
+    cases = [(level, times, total) for level, times, total in cases if times <= total]
+    levels, times, totals = (np.array(c) for c in zip(*cases))
+    mask = sweep_thresholds.alert_mask(
+        times, levels, totals, get_evals.MIN_TIMES, get_evals.BASE_THRESHOLD, get_evals.BASE_LEVEL,
+        get_evals.LEVEL_OFFSET, get_evals.TOTAL_CUTOFF, get_evals.SHARE,
+        get_evals.PENALTY_HIGH, get_evals.PENALTY_LOW)
+    expected = [get_evals.pair_alert(level, t, total) is not None for level, t, total in cases]
+    assert mask.tolist() == expected
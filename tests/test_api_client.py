@@ -0,0 +1,104 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import api_client
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.url = "https://api.intra.42.fr/v2/x"
+
+    def json(self):
+        return []
+
+
+def test_retry_after_seconds_date_and_garbage():
+    assert api_client.retry_after(Response(429, {"Retry-After": "3"})) == 3
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= api_client.retry_after(Response(429, {"Retry-After": later})) <= 30
+    assert api_client.retry_after(Response(429, {"Retry-After": "soon"}), attempt=2) == 4
+    assert api_client.retry_after(Response(429), attempt=20) == api_client.MAX_RETRY_AFTER
+
+
+def test_429_retries_are_bounded(monkeypatch):
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        return Response(429, {"Retry-After": "0"})
+
+    monkeypatch.setattr(api_client.requests, "get", get)
+    monkeypatch.setattr(api_client, "MAX_RETRIES", 3)
+    res = api_client._send("https://api.intra.42.fr/v2/x", {}, None, 1)
+    assert res.status_code == 429
+    assert len(calls) == 4
+
+
+def test_429_then_success(monkeypatch):
+    answers = [Response(429, {"Retry-After": "0"}), Response(200)]
+    monkeypatch.setattr(api_client.requests, "get", lambda url, **kwargs: answers.pop(0))
+    assert api_client._send("https://api.intra.42.fr/v2/x", {}, None, 1).status_code == 200
+
+
+def test_memory_cache_is_bounded(monkeypatch, tmp_path):
+    monkeypatch.setattr(api_client, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(api_client, "MEMORY_ENTRIES", 3)
+    monkeypatch.setattr(api_client, "_memory", api_client.OrderedDict())
+    for i in range(10):
+        api_client._store(f"{i:02d}key", {"body": [i]})
+    assert list(api_client._memory) == ["07key", "08key", "09key"]
+    # evicted entries are still served from disk
+    assert api_client._load("00key") == {"body": [0]}
+    assert "07key" not in api_client._memory
+
+
+def test_endpoint_groups_ids_and_logins():
+    assert api_client.endpoint("https://api.intra.42.fr/v2/users/bob/locations?page=2") == "users/*/locations"
+    assert api_client.endpoint("https://api.intra.42.fr/v2/users/alice") == "users/*"
+    assert api_client.endpoint("https://api.intra.42.fr/v2/scale_teams") == "scale_teams"
+
+
+def test_slow_endpoint_does_not_back_off_against_a_fast_one(monkeypatch):
+    monkeypatch.setattr(api_client, "stats", api_client.Counter())
+    window = api_client.Concurrency(initial=4)
+    clock = [100.0]
+    monkeypatch.setattr(api_client.time, "monotonic", lambda: clock[0])
+
+    def request(latency, name):
+        started = window.acquire()
+        clock[0] += latency
+        window.release(started, 200, name)
+
+    request(0.05, "users/*")
+    for _ in range(5):
+        request(1.0, "scale_teams")
+    assert api_client.stats["backoffs"] == 0
+    request(5.0, "scale_teams")
+    assert api_client.stats["backoffs"] == 1
+
+
+def test_gateway_requests_keep_a_finite_read_timeout(monkeypatch):
+    sent = {}
+
+    def get(url, headers=None, params=None, timeout=None):
+        sent.update(url=url, timeout=timeout)
+        return Response(404)
+
+    monkeypatch.setattr(api_client.requests, "get", get)
+    monkeypatch.setattr(api_client, "GATEWAY_URL", "http://127.0.0.1:4242")
+    api_client.get("https://api.intra.42.fr/v2/users/bob", timeout=10)
+    assert sent["url"] == "http://127.0.0.1:4242/v2/users/bob"
+    assert sent["timeout"] == (10, api_client.GATEWAY_TIMEOUT)
+
+
+def test_no_token_request_behind_the_gateway(monkeypatch):
+    def post(*args, **kwargs):
+        raise AssertionError("token requested from the API")
+
+    monkeypatch.setattr(api_client.requests, "post", post)
+    monkeypatch.setattr(api_client, "GATEWAY_URL", "http://127.0.0.1:4242")
+    res = api_client.post("https://api.intra.42.fr/oauth/token", data={"grant_type": "client_credentials"})
+    res.raise_for_status()
+    assert res.json()["access_token"]
@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+
+import get_campus_users
+
+MINIMUM = datetime(2022, 1, 8, tzinfo=timezone.utc)
+
+
+def test_created_at_boundary_is_strict():
+    assert not get_campus_users.created_after_minimum({"created_at": "2022-01-08T00:00:00.000Z"}, MINIMUM)
+    assert get_campus_users.created_after_minimum({"created_at": "2022-01-08T00:00:01.000Z"}, MINIMUM)
+    assert not get_campus_users.created_after_minimum({}, MINIMUM)
+    assert get_campus_users.created_after_minimum({}, None)
+
+
+def test_created_after_without_offset_is_utc():
+    minimum = get_campus_users.parse_minimum_date("2023-01-01")
+    assert minimum == datetime(2023, 1, 1, tzinfo=timezone.utc)
+    assert get_campus_users.created_after_minimum({"created_at": "2023-01-01T00:00:01.000Z"}, minimum)
+    assert not get_campus_users.created_after_minimum({"created_at": "2022-12-31T23:59:59.000Z"}, minimum)
+    assert get_campus_users.parse_minimum_date("2023-01-01T00:00:00Z") == minimum
+    assert get_campus_users.parse_minimum_date("") is None
+
+
+def fan_out_args(campuses):
+    import argparse
+    return argparse.Namespace(campuses=campuses, workers=2, created_after=None, created_before=None,
+                              pool_year=None, pool_month=None, include_inactive=False)
+
+
+def fake_process_campus(failing):
+    def process_campus(campus_id, token, filters):
+        if campus_id in failing:
+            raise RuntimeError("boom")
+        results = [(f"u{campus_id}", "Learner")]
+        get_campus_users.save_results(results, get_campus_users.CAMPUS_FILE.format(campus_id))
+        return results, []
+    return process_campus
+
+
+def test_failed_campus_keeps_its_previous_listing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "users").mkdir()
+    (tmp_path / "users/campus_2_users.txt").write_text("old2\tTranscender\n", encoding="utf-8")
+    monkeypatch.setattr(get_campus_users.api_client, "GATEWAY_URL", "http://gateway")
+    monkeypatch.setattr(get_campus_users, "process_campus", fake_process_campus({"2"}))
+
+    get_campus_users.fan_out(fan_out_args("1,2"), "token")
+    merged = (tmp_path / "users/all_campus_users.txt").read_text(encoding="utf-8").splitlines()
+    assert merged == ["u1\tLearner\t1", "old2\tTranscender\t2"]
+
+
+def test_failed_campus_without_listing_writes_nothing(tmp_path, monkeypatch):
+    import pytest
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "users").mkdir()
+    (tmp_path / "users/all_campus_users.txt").write_text("previous\tLearner\t1\n", encoding="utf-8")
+    monkeypatch.setattr(get_campus_users.api_client, "GATEWAY_URL", "http://gateway")
+    monkeypatch.setattr(get_campus_users, "process_campus", fake_process_campus({"2"}))
+
+    with pytest.raises(SystemExit):
+        get_campus_users.fan_out(fan_out_args("1,2"), "token")
+    assert (tmp_path / "users/all_campus_users.txt").read_text(encoding="utf-8") == "previous\tLearner\t1\n"
+
+
+class Page:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def test_failed_page_fails_the_campus(tmp_path, monkeypatch):
+    import pytest
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "users").mkdir()
+    (tmp_path / "users/campus_2_users.txt").write_text("old2\tTranscender\n", encoding="utf-8")
+    monkeypatch.setattr(get_campus_users.api_client, "GATEWAY_URL", "http://gateway")
+    monkeypatch.setattr(get_campus_users, "fetch_grades", lambda logins, *a, **k: [(l, "Learner") for l in logins])
+    monkeypatch.setattr(get_campus_users, "save_changes", lambda *a, **k: None)
+
+    def get(url, headers=None, params=None):
+        if "/campus/2/" in url:
+            return Page(500) if params["page"] == 2 else Page(200, [{"login": "new2", "active?": True}])
+        return Page(200, [{"login": "u1", "active?": True}] if params["page"] == 1 else [])
+
+    monkeypatch.setattr(get_campus_users.api_client, "get", get)
+    with pytest.raises(RuntimeError):
+        get_campus_users.fetch_campus_users("token", "https://api.intra.42.fr/v2/campus/2/users", created_after=None)
+
+    get_campus_users.fan_out(fan_out_args("1,2"), "token")
+    merged = (tmp_path / "users/all_campus_users.txt").read_text(encoding="utf-8").splitlines()
+    assert merged == ["u1\tLearner\t1", "old2\tTranscender\t2"]
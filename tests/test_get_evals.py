@@ -0,0 +1,72 @@
+def test_watch_refreshes_expired_evaluator_levels(evals_state, index, monkeypatch):
+    get_evals = evals_state
+    get_evals.user_levels.update({"fresh": 4.0, "expired": 4.0})
+    index.remember("fresh", 1, 4.0)
+    fetched = []
+
+    def get_user_data(login, headers):
+        fetched.append(login)
+        return 2, 9.5
+
+    monkeypatch.setattr(get_evals, "get_user_data", get_user_data)
+    assert get_evals.refresh_levels(["fresh", "expired"], {}) == {"expired"}
+    assert fetched == ["expired"]
+    assert get_evals.user_levels["expired"] == 9.5
+
+
+def add_scale_team(get_evals, scale_team_id, evaluator, evaluated, day, delta=1):
+    get_evals.scale_team_deltas[(scale_team_id, evaluator)] = [(evaluated, delta)]
+    get_evals.scale_team_dates[scale_team_id] = f"2024-01-{day:02d}T10:00:00Z"
+
+
+def test_window_pair_alerts_when_other_pairs_raise_the_total(evals_state):
+    get_evals = evals_state
+    get_evals.user_levels.update({"ev": 5.0, "x": 4.0, **{f"o{i}": 4.0 for i in range(8)}})
+    for i in range(4):
+        add_scale_team(get_evals, i, "ev", "x", 1 + i)
+    for i in range(8):
+        add_scale_team(get_evals, 10 + i, "ev", f"o{i}", 6 + i)
+
+    assert get_evals.pair_alert(5.0, 4, 12) == (4 / 12, 9)
+    alerts = get_evals.window_alerts(30)
+    assert [(a["evaluated"], a["times"], a["adjusted"]) for a in alerts] == [("x", 4, 9)]
+
+
+def test_window_pair_alerts_again_after_leaving_the_rule(evals_state):
+    get_evals = evals_state
+    get_evals.user_levels.update({"ev": 1.0, "x": 1.0})
+    # a burst of 4 in January, nothing for months, another burst of 4 in June
+    for i in range(4):
+        add_scale_team(get_evals, i, "ev", "x", 1 + i)
+    for i in range(4):
+        get_evals.scale_team_deltas[(100 + i, "ev")] = [("x", 1)]
+        get_evals.scale_team_dates[100 + i] = f"2024-06-{1 + i:02d}T10:00:00Z"
+
+    alerts = get_evals.window_alerts(30)
+    assert [(a["window_end"].month, a["times"]) for a in alerts] == [(1, 4), (6, 4)]
+
+
+def test_pair_counts_go_to_the_current_file(evals_state, tmp_path, monkeypatch):
+    get_evals = evals_state
+    # gen_synthetic.py bench points the file elsewhere after import
+    monkeypatch.setattr(get_evals, "PAIR_COUNTS_FILE", str(tmp_path / "bench_pair_counts.json"))
+    get_evals.user_levels.update({"ev": 5.0, "x": 4.0})
+    get_evals.evaluations_map["ev"]["x"] = 2
+    get_evals.save_pair_counts()
+    assert (tmp_path / "bench_pair_counts.json").exists()
+
+
+def test_pair_counts_keep_pairs_the_report_did_not_resolve(evals_state, index, tmp_path, monkeypatch):
+    get_evals = evals_state
+    monkeypatch.setattr(get_evals, "PAIR_COUNTS_FILE", str(tmp_path / "pair_counts.json"))
+    get_evals.user_levels["ev"] = 5.0
+    get_evals.evaluations_map["ev"].update({"x": 1, "y": -1})
+    index.remember("x", 1, 4.0)
+    index.remember("y", 2, None)
+
+    assert get_evals.levels_needed(["ev"]) == set()  # no pair of ev can alert
+    get_evals.export_alerts_report()
+    import json
+    saved = json.loads((tmp_path / "pair_counts.json").read_text(encoding="utf-8"))
+    assert saved["counts"] == {"ev": {"x": 1}}
+    assert saved["levels"]["x"] == 4.0 and saved["levels"]["y"] is None
@@ -0,0 +1,40 @@
+import get_evals_from_txt
+
+
+def test_cohorts_with_the_same_stem_are_all_kept():
+    names = get_evals_from_txt.cohort_names(["2023/march.txt", "2024/march.txt", "users/april.txt"])
+    assert names == {"2023/march": "2023/march.txt", "2024/march": "2024/march.txt", "april": "users/april.txt"}
+
+
+def test_report_uses_the_shared_rule(monkeypatch, tmp_path):
+    m = get_evals_from_txt
+    monkeypatch.setattr(m, "get_token", lambda: "t")
+    monkeypatch.setattr(m, "DESTINY_FILE", str(tmp_path / "out.xlsx"))
+    m.evaluations_map.clear()
+    m.user_levels.clear()
+    m.evaluations_map["ev"].update({"x": 4, **{f"o{i}": 1 for i in range(8)}})
+    m.user_levels.update({"ev": 5.0, "x": 4.0})
+    m.export_alerts_report()
+    from openpyxl import load_workbook
+    rows = list(load_workbook(tmp_path / "out.xlsx").active.iter_rows(values_only=True))
+    assert rows[1][:3] == ("ev", 5.0, "x") and rows[1][6] == 9
+    m.evaluations_map.clear()
+    m.user_levels.clear()
+
+
+def test_report_with_cohorts_that_share_a_stem(monkeypatch, tmp_path):
+    m = get_evals_from_txt
+    monkeypatch.setattr(m, "get_token", lambda: "t")
+    monkeypatch.setattr(m, "DESTINY_FILE", str(tmp_path / "out.xlsx"))
+    m.evaluations_map.clear()
+    m.user_levels.clear()
+    m.evaluations_map["ev"].update({"x": 4, **{f"o{i}": 1 for i in range(8)}})
+    m.user_levels.update({"ev": 5.0, "x": 4.0})
+    names = m.cohort_names(["2023/march.txt", "2024/march.txt", "a_very_long_directory_name/march.txt"])
+    m.export_alerts_report({name: ["ev"] for name in names})
+    from openpyxl import load_workbook
+    wb = load_workbook(tmp_path / "out.xlsx")
+    assert wb.sheetnames == ["2023_march", "2024_march", "a_very_long_directory_name_marc"]
+    assert all(len(list(wb[t].iter_rows())) == 2 for t in wb.sheetnames)
+    m.evaluations_map.clear()
+    m.user_levels.clear()
@@ -0,0 +1,15 @@
+import get_evals
+import get_user_eval
+
+
+def test_received_alerts_follow_the_rule_of_get_evals(monkeypatch):
+    counter = {"a": 4, "b": 3, **{f"o{i}": 1 for i in range(8)}}
+    threshold, alerts = get_user_eval.received_alerts(5.0, counter)
+    assert threshold == 4
+    assert alerts == [("a", 4, 9), ("b", 3, 8)]
+    assert all(get_evals.pair_alert(5.0, times, 15) for _, times, _ in alerts)
+
+    # a tuned rule applies to this view too
+    monkeypatch.setattr(get_evals, "TOTAL_CUTOFF", 20)
+    monkeypatch.setattr(get_evals, "LEVEL_OFFSET", 2)
+    assert get_user_eval.received_alerts(5.0, counter) == (3, [("a", 4, 4)])
@@ -0,0 +1,7 @@
+import project_catalog
+
+
+def test_categories_ignore_spaces_and_empty_entries():
+    assert project_catalog.parse_categories("common_core, piscine,") == {"common_core", "piscine"}
+    assert project_catalog.parse_categories(" outer_core ") == {"outer_core"}
+    assert project_catalog.parse_categories("") == set()
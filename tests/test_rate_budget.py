@@ -0,0 +1,27 @@
+import time
+import threading
+
+import rate_budget
+
+
+def test_requests_are_spaced_by_the_rate():
+    budget = rate_budget.RateBudget(rate=50, hourly=1000)
+    started = time.monotonic()
+    for _ in range(6):
+        budget.acquire()
+    assert time.monotonic() - started >= 5 / 50 - 0.005
+
+
+def test_interactive_lane_goes_first():
+    budget = rate_budget.RateBudget(rate=20, hourly=1000)
+    budget.acquire()  # the next one has to wait
+    order = []
+    threads = [threading.Thread(target=lambda lane=lane: (budget.acquire(lane), order.append(lane)))
+               for lane in ("bulk", "bulk", "interactive")]
+    for t in threads:
+        t.start()
+        time.sleep(0.005)
+    for t in threads:
+        t.join()
+    assert order.index("interactive") <= 1
+
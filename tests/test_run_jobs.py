@@ -0,0 +1,35 @@
+import run_jobs
+
+
+def test_plan_fetches_each_resource_once_in_order():
+    analyses = [run_jobs.GivenAlerts, run_jobs.Corrections, run_jobs.Hours]
+    assert run_jobs.plan(analyses) == ["profile", "scale_teams", "as_corrector", "locations"]
+    assert run_jobs.plan([run_jobs.ReceivedCsv]) == ["profile", "scale_teams"]
+
+
+def test_only_cpu_bound_analyses_get_jobs():
+    assert run_jobs.create(run_jobs.Hours, 4).jobs == 4
+    assert run_jobs.create(run_jobs.GivenAlerts, 4).jobs == 4
+    assert isinstance(run_jobs.create(run_jobs.ReceivedAlerts, 4), run_jobs.ReceivedAlerts)
+
+
+def correction(evaluated):
+    return {"corrector": {"login": "ev"}, "team": {"users": [{"login": evaluated}], "project": {"name": "libft"}},
+            "final_mark": 100, "comment": "ok", "created_at": "2024-01-01"}
+
+
+def test_corrections_replace_the_csv_only_when_finished(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "evaluaciones.csv").write_text("previous run\n", encoding="utf-8")
+
+    failed = run_jobs.Corrections()
+    failed.add("ev", {"as_corrector": [correction("a")]}, {})
+    failed.close()  # the run stopped before finish()
+    assert (tmp_path / "evaluaciones.csv").read_text(encoding="utf-8") == "previous run\n"
+    assert not (tmp_path / "evaluaciones.csv.tmp").exists()
+
+    done = run_jobs.Corrections()
+    done.add("ev", {"as_corrector": [correction("a"), correction("b")]}, {})
+    done.finish()
+    done.close()
+    assert (tmp_path / "evaluaciones.csv").read_text(encoding="utf-8").count("\n") == 3
@@ -0,0 +1,35 @@
+import io
+import argparse
+
+import show_user
+
+PROFILE = {
+    "login": "bob",
+    "cursus_users": [
+        {"id": 21, "cursus_id": 9, "user_id": 21, "level": 3.5, "grade": None},
+        {"id": 700, "cursus_id": 21, "user_id": 5, "level": 7.2, "grade": "Transcender"},
+    ],
+    "projects_users": [{"id": 1314, "current_team_id": 21, "project": {"id": 21, "name": "libft"}}],
+    "titles": ["a", "b"],
+}
+
+
+def test_index_matches_the_list_own_id():
+    assert show_user.get_path(PROFILE, "cursus_users[21].level") == 7.2
+    assert show_user.get_path(PROFILE, "cursus_users[9].level") == 3.5
+    assert show_user.get_path(PROFILE, "projects_users[21].project.name") == "libft"
+    assert show_user.get_path(PROFILE, "titles[1]") == "b"
+    assert show_user.get_path(PROFILE, "cursus_users[42].level") is None
+
+
+def test_explicit_key_selection():
+    assert show_user.get_path(PROFILE, "cursus_users[grade=Transcender].cursus_id") == 21
+    assert show_user.get_path(PROFILE, "cursus_users[id=21].cursus_id") == 9
+
+
+def test_stdin_is_read_once_and_left_open(monkeypatch):
+    stdin = io.StringIO("ann\ncid\n")
+    monkeypatch.setattr(show_user.sys, "stdin", stdin)
+    args = argparse.Namespace(login=["bob", "-"], file="-")
+    assert show_user.read_logins(args) == ["bob", "ann", "cid"]
+    assert not stdin.closed
@@ -0,0 +1,33 @@
+import snapshots
+
+
+def test_diff_by_key_and_fields():
+    old = [{"login": "a", "grade": "Learner", "level": 3.1},
+           {"login": "b", "grade": "Learner", "level": 5.0},
+           {"login": "c", "grade": "Transcender", "level": 9.0}]
+    new = [{"login": "a", "grade": "Learner", "level": 3.4},
+           {"login": "b", "grade": "Transcender", "level": 5.0},
+           {"login": "d", "grade": "Learner", "level": 0.0}]
+
+    result = snapshots.diff(old, new, "login", ["grade"])
+    assert [r["login"] for r in result["added"]] == ["d"]
+    assert [r["login"] for r in result["removed"]] == ["c"]
+    assert result["changed"] == {"b": {"grade": ("Learner", "Transcender")}}
+    assert snapshots.changed_keys(result, "login") == ["d", "b"]
+
+    every_field = snapshots.diff(old, new, "login")
+    assert every_field["changed"]["a"] == {"level": (3.1, 3.4)}
+
+
+def test_records_without_key_are_ignored():
+    result = snapshots.diff([{"id": None}], [{"id": None}, {"name": "x"}], "id")
+    assert result == {"added": [], "removed": [], "changed": {}}
+
+
+def test_save_and_diff_against_the_previous_snapshot(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", tmp_path)
+    assert snapshots.save_and_diff("campus", [{"id": 1, "name": "Malaga"}], "id") is None
+    result = snapshots.save_and_diff("campus", [{"id": 1, "name": "Málaga"}, {"id": 2, "name": "Madrid"}], "id")
+    assert result["changed"] == {1: {"name": ("Malaga", "Málaga")}}
+    assert [r["id"] for r in result["added"]] == [2]
+    assert len(snapshots.list_snapshots("campus")) == 2
@@ -0,0 +1,51 @@
+import os
+import random
+from collections import Counter, defaultdict
+
+import spill_agg
+
+
+def sample(n=5000, seed=1):
+    rng = random.Random(seed)
+    return [(f"e{rng.randrange(60)}", f"d{rng.randrange(200)}", rng.choice([1, 1, 1, -1])) for _ in range(n)]
+
+
+def in_memory(rows):
+    counts = defaultdict(Counter)
+    for a, b, d in rows:
+        counts[a][b] += d
+    return {a: dict(c) for a, c in counts.items()}
+
+
+def test_spilled_runs_merge_to_the_in_memory_counts(tmp_path):
+    rows = sample()
+    with spill_agg.SpillCounter(0, str(tmp_path)) as counter:
+        for row in rows:
+            counter.add(*row)
+        assert len(counter.runs) > 1  # the 1000 entry floor forced spills
+        merged = dict(counter.by_evaluator())
+        tmp = counter.tmp
+    assert merged == in_memory(rows)
+    assert list(merged) == sorted(merged)
+    assert not os.path.exists(tmp)
+
+
+def test_compaction_keeps_the_counts(tmp_path, monkeypatch):
+    monkeypatch.setattr(spill_agg, "MAX_RUNS", 2)
+    rows = sample(8000, seed=2)
+    with spill_agg.SpillCounter(0, str(tmp_path)) as counter:
+        for row in rows:
+            counter.add(*row)
+        assert len(counter.runs) <= 3
+        assert dict(counter.by_evaluator()) == in_memory(rows)
+
+
+def test_read_csv_skips_missing_marks_and_excluded_projects(tmp_path):
+    path = tmp_path / "evaluaciones.csv"
+    path.write_text(
+        "evaluator_login,evaluated,proyect,final_mark,comment,created_at\n"
+        "a,b,libft,100,ok,2024\n"
+        "a,b,libft,N/A,ok,2024\n"
+        "a,c,ft_printf,0,ok,2024\n"
+        "a,d,C Piscine Shell 00,100,ok,2024\n", encoding="utf-8")
+    assert list(spill_agg.read_csv(str(path))) == [("a", "b", 1), ("a", "c", -1)]
@@ -0,0 +1,27 @@
+import time
+
+
+def test_remember_without_grade_keeps_the_stored_grade(index):
+    index.remember("bob", 1, 7.2, grade="Transcender")
+    index.remember("bob", 1, 7.3)
+    assert index.cached_level("bob") == (True, 7.3)
+    assert index.cached_grade("bob") == (True, "Transcender")
+
+
+def test_grade_never_given_is_a_cache_miss(index):
+    index.remember("ann", 2, 3.0)
+    assert index.cached_level("ann") == (True, 3.0)
+    assert index.cached_grade("ann") == (False, None)
+
+
+def test_old_grade_is_a_cache_miss(index):
+    index.remember("eve", 3, 9.0, grade="Transcender")
+    index._users["eve"]["grade_at"] = time.time() - index.LEVEL_MAX_AGE - 1
+    assert index.cached_grade("eve") == (False, None)
+
+
+def test_ids_and_logins(index):
+    index.remember("bob", 42, with_level=False)
+    assert index.user_id("bob") == 42
+    assert index.login_of(42) == "bob"
+    assert index.cached_entry("bob") is None